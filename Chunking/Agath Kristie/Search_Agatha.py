@@ -1,13 +1,118 @@
 import re
 import os
+import hashlib
+import mmap
+import bisect
+import functools
+import itertools
+import sqlite3
+import numpy as np
+import torch
 import wx
 import wx.lib.mixins.listctrl as listmix
 import chromadb
 from sentence_transformers import SentenceTransformer
 from typing import List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+import queue
 import threading
 import time
 
+_SENT_RE = re.compile(rb'[.!?]+')
+_TITLE_SKIP_RE = re.compile(r'CHAPTER|Chapter|PART|Part')
+
+# Unit-length embeddings ranked by inner product; HNSW tuned for a few hundred thousand sentences
+_COLLECTION_METADATA = {
+    "description": "Agatha Christie novels embeddings",
+    "hnsw:space": "ip",
+    "hnsw:construction_ef": 100,
+    "hnsw:M": 16,
+    "hnsw:search_ef": 64
+}
+
+
+def _decode_text(raw: bytes) -> str:
+    """Decode UTF-8 bytes the way text-mode open() would (errors ignored, universal newlines)"""
+    return raw.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _load_novel(filepath: str) -> Tuple[str, List[str]]:
+    """
+    Memory-map a novel and split it into cleaned sentences (runs in a thread pool).
+    The regex scans the mapped bytes; only segments that survive the length filter are decoded.
+    Returns the first lines of the file (for metadata) and the sentences.
+    """
+    with open(filepath, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return "", []
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # First 10 lines for title detection
+            head_end = -1
+            for _ in range(10):
+                head_end = mm.find(b'\n', head_end + 1)
+                if head_end == -1:
+                    break
+            head = _decode_text(mm[:head_end + 1] if head_end != -1 else mm[:])
+
+            sentences = []
+            prev = 0
+            for match in itertools.chain(_SENT_RE.finditer(mm), [None]):
+                end = match.start() if match else len(mm)
+                raw = mm[prev:end]
+                # Decoding never lengthens a segment, so the bytes length is a safe pre-filter
+                if len(raw.strip()) > 10:
+                    segment = _decode_text(raw).strip()
+                    if len(segment) > 10:
+                        sentences.append(segment)
+                if match:
+                    prev = match.end()
+
+    return head, sentences
+
+
+class EmbeddingCache:
+    def __init__(self, db_path: str, precision: str, dtype=np.float16):
+        """
+        Persistent sentence embedding cache stored in SQLite, keyed by content hash.
+        Vectors are stored in `dtype`; each model precision (e.g. CUDA FP16 or CPU INT8)
+        and dtype gets its own table, so one model's vectors are never served for another.
+        """
+        self.db_path = db_path
+        self.dtype = np.dtype(dtype)
+        self.table = f"cache_{precision}_{self.dtype.name}"
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (hash BLOB PRIMARY KEY, vec BLOB)")
+        self.conn.commit()
+
+    @staticmethod
+    def hash_sentence(sentence: str) -> bytes:
+        """Hash a sentence into a 16-byte cache key"""
+        return hashlib.blake2b(sentence.encode('utf-8'), digest_size=16).digest()
+
+    def get_many(self, hashes: List[bytes], chunk_size: int = 500) -> Dict[bytes, np.ndarray]:
+        """Fetch cached vectors for the given hashes, skipping misses"""
+        found = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+
+        for i in range(0, len(unique_hashes), chunk_size):
+            chunk = unique_hashes[i:i + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT hash, vec FROM {self.table} WHERE hash IN ({placeholders})", chunk)
+            for sentence_hash, vec in rows:
+                found[sentence_hash] = np.frombuffer(vec, dtype=self.dtype)
+
+        return found
+
+    def put_many(self, hashes: List[bytes], vectors):
+        """Store vectors for the given hashes as raw bytes of the cache dtype"""
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table} (hash, vec) VALUES (?, ?)",
+            ((sentence_hash, np.asarray(vec, dtype=self.dtype).tobytes())
+             for sentence_hash, vec in zip(hashes, vectors))
+        )
+        self.conn.commit()
+
 
 class NovelSearcher:
     def __init__(self, persist_directory: str = "./agatha_christie_db"):
@@ -19,8 +124,14 @@ class NovelSearcher:
         self.model = None
         self.client = None
         self.collection = None
+        self.embedding_cache = None
         self.is_initialized = False
 
+        # Query embedding and result caches; results are invalidated by bumping the epoch on reindex
+        self._cache_epoch = 0
+        self._embed_query = functools.lru_cache(maxsize=512)(self._encode_query)
+        self._search_cache = functools.lru_cache(maxsize=512)(self._semantic_search_uncached)
+
     def _extract_metadata(self, filename, content):
         """Extract metadata from novel content"""
         metadata = {
@@ -31,19 +142,30 @@ class NovelSearcher:
         }
 
         # Try to extract title from content (first line or common patterns)
-        lines = content.split('\n')
-        for line in lines[:10]:  # Check first 10 lines
+        for line in content.split('\n', 10)[:10]:  # Check first 10 lines
             line = line.strip()
             if line and len(line) < 200:  # Reasonable title length
-                if not line.startswith(('CHAPTER', 'Chapter', 'CHAPTER', 'PART', 'Part')):
+                if not _TITLE_SKIP_RE.match(line):
                     metadata["title"] = line
                     break
 
         return metadata
 
+    @staticmethod
+    def _join_sentences(sentences: List[str]) -> Tuple[str, List[int]]:
+        """
+        Join sentences with a unit separator for single-pass searching.
+        offsets[i] is the blob index where sentence i + 1 starts.
+        """
+        blob = "\x1f".join(sentences)
+        offsets = list(itertools.accumulate(len(s) + 1 for s in sentences))
+        return blob, offsets
+
     def load_novels_from_folder(self, folder_path: str) -> Dict:
         """
         Load all text novels from a folder.
+        Files are memory-mapped and split into sentences on a thread pool, so the
+        reads overlap; the bytes split itself is cheap enough to stay in this process.
         """
         novels = {}
         supported_extensions = {'.txt', '.pdf'}  # Add PDF support later if needed
@@ -51,30 +173,52 @@ class NovelSearcher:
         if not os.path.exists(folder_path):
             return novels
 
-        for filename in os.listdir(folder_path):
-            filepath = os.path.join(folder_path, filename)
-            if os.path.isfile(filepath) and any(filename.lower().endswith(ext) for ext in supported_extensions):
-                try:
-                    with open(filepath, 'r', encoding='utf-8', errors='ignore') as file:
-                        content = file.read()
-
-                    # Split into sentences
-                    sentences = re.split(r'[.!?]+', content)
-                    sentences = [s.strip() for s in sentences if s.strip() and len(s.strip()) > 10]
+        candidates = []
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(tuple(supported_extensions)) and entry.is_file():
+                    candidates.append((entry.name, entry.path))
 
-                    metadata = self._extract_metadata(filename, content)
-                    metadata["sentences"] = sentences
-                    metadata["filepath"] = filepath
-                    metadata["sentence_count"] = len(sentences)
+        if not candidates:
+            return novels
 
-                    novels[filename] = metadata
-                    print(f"Loaded {filename}: {len(sentences)} sentences")
+        # No process pool: this runs on the GUI's worker thread, where forking a process that
+        # already runs wx and torch risks deadlocks and spawning re-imports all of them
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [(filename, filepath, executor.submit(_load_novel, filepath))
+                       for filename, filepath in candidates]
 
+            for filename, filepath, future in futures:
+                try:
+                    head, sentences = future.result()
                 except Exception as e:
                     print(f"Error loading {filename}: {e}")
+                    continue
+
+                metadata = self._extract_metadata(filename, head)
+                metadata["sentences"] = sentences
+                metadata["sentences_blob"], metadata["sentence_offsets"] = self._join_sentences(sentences)
+                metadata["sentences_lower_blob"], metadata["sentence_lower_offsets"] = self._join_sentences(
+                    [s.lower() for s in sentences])
+                metadata["filepath"] = filepath
+                metadata["sentence_count"] = len(sentences)
+
+                novels[filename] = metadata
+                print(f"Loaded {filename}: {len(sentences)} sentences")
 
         return novels
 
+    @staticmethod
+    def _corpus_fingerprint(novels: Dict) -> str:
+        """
+        Fingerprint the novel files from their names, modification times and sizes (no parsing).
+        """
+        entries = []
+        for filename, novel_data in novels.items():
+            stat = os.stat(novel_data["filepath"])
+            entries.append((filename, stat.st_mtime_ns, stat.st_size))
+        return hashlib.sha1(repr(sorted(entries)).encode('utf-8')).hexdigest()
+
     def _needs_reindexing(self, current_novels: Dict) -> bool:
         """
         Check if we need to reindex the database.
@@ -85,11 +229,20 @@ class NovelSearcher:
         try:
             client = chromadb.PersistentClient(path=self.persist_directory)
             collection = client.get_collection("christie_novels")
-            if collection.count() == 0:
+            existing_count = collection.count()
+            if existing_count == 0:
                 return True
 
-            # Check if novel count matches
-            existing_count = collection.count()
+            # Embeddings are unit length, so the index must rank by inner product
+            if (collection.metadata or {}).get("hnsw:space") != "ip":
+                return True
+
+            # Compare the stored file fingerprint when the collection has one
+            stored_fingerprint = (collection.metadata or {}).get("fingerprint")
+            if stored_fingerprint:
+                return stored_fingerprint != self._corpus_fingerprint(current_novels)
+
+            # Older collections: check if novel count matches
             current_count = sum(len(novel["sentences"]) for novel in current_novels.values())
 
             # Allow some tolerance for minor changes
@@ -98,6 +251,31 @@ class NovelSearcher:
         except:
             return True
 
+    def _load_model(self) -> SentenceTransformer:
+        """
+        Load the sentence model at reduced precision: FP16 on CUDA, dynamic INT8 linear layers on CPU.
+        On CUDA the transformer is also compiled with torch.compile and warmed up here.
+        """
+        if torch.cuda.is_available():
+            model = SentenceTransformer('all-MiniLM-L6-v2', device='cuda').half()
+            # Compiled in place: newer sentence-transformers expose auto_model as a read-only property
+            auto_model = model._first_module().auto_model
+            try:
+                auto_model.compile(mode='reduce-overhead', dynamic=True, fullgraph=False)
+                # Trigger compilation now rather than on the first real batch
+                model.encode(["warmup"] * 8, show_progress_bar=False)
+            except Exception as e:
+                print(f"torch.compile unavailable, using eager model: {e}")
+                return SentenceTransformer('all-MiniLM-L6-v2', device='cuda').half()
+            return model
+
+        model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
+        # In place: newer sentence-transformers expose auto_model as a read-only property
+        torch.quantization.quantize_dynamic(
+            model._first_module().auto_model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+        return model
+
     def initialize(self, novels: Dict, progress_callback=None) -> bool:
         """
         Initialize the system with Agatha Christie novels.
@@ -109,7 +287,7 @@ class NovelSearcher:
 
         # Initialize model
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = self._load_model()
         except Exception as e:
             print(f"Error loading model: {e}")
             return False
@@ -119,12 +297,21 @@ class NovelSearcher:
             self.client = chromadb.PersistentClient(path=self.persist_directory)
             self.collection = self.client.get_or_create_collection(
                 name="christie_novels",
-                metadata={"description": "Agatha Christie novels embeddings"}
+                metadata=_COLLECTION_METADATA
             )
         except Exception as e:
             print(f"Error initializing ChromaDB: {e}")
             return False
 
+        # Open the embedding cache next to the vector database
+        try:
+            precision = "cuda_fp16" if self.model.device.type == 'cuda' else "cpu_int8"
+            self.embedding_cache = EmbeddingCache(
+                os.path.join(self.persist_directory, "embedding_cache.sqlite3"), precision)
+        except Exception as e:
+            print(f"Error opening embedding cache: {e}")
+            return False
+
         # Check if we need to compute embeddings
         if self._needs_reindexing(novels):
             success = self._store_embeddings_batched(progress_callback)
@@ -147,82 +334,157 @@ class NovelSearcher:
 
             self.collection = self.client.get_or_create_collection(
                 name="christie_novels",
-                metadata={"description": "Agatha Christie novels embeddings"}
+                metadata={**_COLLECTION_METADATA, "fingerprint": self._corpus_fingerprint(self.novels)}
             )
 
-            # Prepare all data
-            all_documents = []
-            all_metadatas = []
-            all_ids = []
-            all_embeddings = []
-
-            total_sentences = sum(len(novel["sentences"]) for novel in self.novels.values())
-            processed_sentences = 0
-
-            # Process each novel
+            # Flatten every novel into one sentence list, remembering who owns each sentence
+            flat_sentences = []
+            owners = []
             for filename, novel_data in self.novels.items():
-                sentences = novel_data["sentences"]
-                title = novel_data["title"]
-
-                # Process in batches
-                embedding_batch_size = 32
-
-                for i in range(0, len(sentences), embedding_batch_size):
-                    batch_sentences = sentences[i:i + embedding_batch_size]
-
-                    # Compute embeddings for this batch
-                    batch_embeddings = self.model.encode(batch_sentences).tolist()
-
-                    # Prepare documents for this batch
-                    for j, sentence in enumerate(batch_sentences):
-                        absolute_index = i + j
-                        all_documents.append(sentence)
-                        all_metadatas.append({
-                            "filename": filename,
-                            "title": title,
-                            "author": "Agatha Christie",
-                            "position": absolute_index,
-                            "novel_position": f"{filename}_{absolute_index}",
-                            "sentence_length": len(sentence)
-                        })
-                        all_ids.append(f"{filename}_{absolute_index}")
-                        all_embeddings.append(batch_embeddings[j])
-
-                    processed_sentences += len(batch_sentences)
-
-                    # Update progress
-                    if progress_callback:
-                        progress_callback(processed_sentences, total_sentences,
-                                          f"Processing: {title}")
-
-            # Store in database in batches
-            db_batch_size = 100
-            print(f"Storing {len(all_documents)} embeddings in database...")
-
-            for i in range(0, len(all_documents), db_batch_size):
-                end_idx = min(i + db_batch_size, len(all_documents))
-
-                batch_documents = all_documents[i:end_idx]
-                batch_metadatas = all_metadatas[i:end_idx]
-                batch_ids = all_ids[i:end_idx]
-                batch_embeddings = all_embeddings[i:end_idx]
-
-                self.collection.add(
-                    documents=batch_documents,
-                    metadatas=batch_metadatas,
-                    ids=batch_ids,
-                    embeddings=batch_embeddings
-                )
-
-                if progress_callback:
-                    progress_callback(end_idx, len(all_documents), "Storing embeddings")
+                for position, sentence in enumerate(novel_data["sentences"]):
+                    flat_sentences.append(sentence)
+                    owners.append((filename, position))
+
+            # Reuse cached embeddings and only encode sentences not seen before
+            hashes = [EmbeddingCache.hash_sentence(sentence) for sentence in flat_sentences]
+            embeddings_by_hash = self.embedding_cache.get_many(hashes)
+
+            missing = {}
+            rows_by_missing_hash = {}
+            ready_rows = []
+            for row, (sentence, sentence_hash) in enumerate(zip(flat_sentences, hashes)):
+                if sentence_hash in embeddings_by_hash:
+                    ready_rows.append(row)
+                else:
+                    missing.setdefault(sentence_hash, sentence)
+                    rows_by_missing_hash.setdefault(sentence_hash, []).append(row)
+
+            titles = {filename: novel_data["title"] for filename, novel_data in self.novels.items()}
+            total_rows = len(flat_sentences)
+            dimension = self.model.get_sentence_embedding_dimension()
+
+            # One contiguous float32 matrix holds every embedding in row order
+            embedding_matrix = np.empty((total_rows, dimension), dtype=np.float32)
+            if ready_rows:
+                embedding_matrix[ready_rows] = np.stack([embeddings_by_hash[hashes[row]] for row in ready_rows])
+            # Fill each add() up to Chroma's own limit to keep SQLite transactions few
+            if hasattr(self.client, 'get_max_batch_size'):
+                db_batch_size = self.client.get_max_batch_size()
+            else:
+                db_batch_size = getattr(self.client, 'max_batch_size', 5000)
+            print(f"Storing {total_rows} embeddings in database...")
+
+            # Persist batches on a writer thread so ChromaDB inserts overlap with encoding
+            write_queue = queue.Queue(maxsize=2)
+            write_errors = []
+            stored = [0]
+
+            def writer():
+                while (batch := write_queue.get()) is not None:
+                    if write_errors:
+                        continue
+                    try:
+                        self.collection.add(**batch)
+                        stored[0] += len(batch["ids"])
+                        if progress_callback:
+                            progress_callback(stored[0], total_rows, "Storing embeddings")
+                    except Exception as e:
+                        write_errors.append(e)
+
+            pending_rows = []
+
+            def queue_rows(rows, flush=False):
+                pending_rows.extend(rows)
+                while len(pending_rows) >= db_batch_size or (flush and pending_rows):
+                    batch_rows = pending_rows[:db_batch_size]
+                    del pending_rows[:db_batch_size]
+                    write_queue.put({
+                        "documents": [flat_sentences[row] for row in batch_rows],
+                        "metadatas": [
+                            {
+                                "filename": owners[row][0],
+                                "title": titles[owners[row][0]],
+                                "author": "Agatha Christie",
+                                "position": owners[row][1],
+                                "novel_position": f"{owners[row][0]}_{owners[row][1]}",
+                                "sentence_length": len(flat_sentences[row])
+                            }
+                            for row in batch_rows
+                        ],
+                        "ids": [f"{owners[row][0]}_{owners[row][1]}" for row in batch_rows],
+                        "embeddings": embedding_matrix[batch_rows]
+                    })
+
+            writer_thread = threading.Thread(target=writer, daemon=True)
+            writer_thread.start()
 
+            try:
+                # Cached sentences can be written straight away while the misses encode
+                queue_rows(ready_rows)
+
+                # Encode cache misses across all novels with smart batching: sort by token
+                # length and encode uniform-length buckets so little compute goes to padding
+                if missing:
+                    missing_hashes = list(missing.keys())
+                    missing_sentences = list(missing.values())
+
+                    lengths = self.model.tokenizer(
+                        missing_sentences,
+                        add_special_tokens=False,
+                        truncation=True,
+                        max_length=self.model.max_seq_length,
+                        return_attention_mask=False,
+                        return_token_type_ids=False,
+                        return_length=True
+                    )['length']
+                    order = np.argsort(lengths, kind='stable')
+
+                    bucket_size = 128
+                    missing_embeddings = np.empty((len(missing_sentences), dimension), dtype=np.float32)
+
+                    for i in range(0, len(order), bucket_size):
+                        bucket = order[i:i + bucket_size]
+                        missing_embeddings[bucket] = self.model.encode(
+                            [missing_sentences[j] for j in bucket],
+                            batch_size=bucket_size,
+                            show_progress_bar=False,
+                            convert_to_numpy=True,
+                            normalize_embeddings=True
+                        )
+
+                        # Hand the rows of this bucket to the writer while the next bucket encodes
+                        bucket_rows = []
+                        for j in bucket:
+                            rows = rows_by_missing_hash[missing_hashes[j]]
+                            embedding_matrix[rows] = missing_embeddings[j]
+                            bucket_rows.extend(rows)
+                        queue_rows(bucket_rows)
+
+                        # Update progress
+                        if progress_callback:
+                            progress_callback(min(i + bucket_size, len(order)), len(order), "Encoding sentences")
+
+                    self.embedding_cache.put_many(missing_hashes, missing_embeddings)
+
+                queue_rows([], flush=True)
+            finally:
+                write_queue.put(None)
+                writer_thread.join()
+
+            if write_errors:
+                raise write_errors[0]
+
+            self._cache_epoch += 1
             return True
 
         except Exception as e:
             print(f"Error storing embeddings: {e}")
             return False
 
+    def _encode_query(self, query: str) -> List[float]:
+        """Encode a search query (cached through self._embed_query)"""
+        return self.model.encode([query], normalize_embeddings=True)[0].tolist()
+
     def semantic_search(self, query: str, top_k: int = 10, novel_filter: str = None) -> List[
         Tuple[str, str, int, float]]:
         """
@@ -234,37 +496,43 @@ class NovelSearcher:
 
         try:
             top_k = min(top_k, 50)
-
-            # Build filter if novel is specified
-            where_filter = None
-            if novel_filter and novel_filter != "All Novels":
-                where_filter = {"title": novel_filter}
-
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=top_k,
-                where=where_filter,
-                include=["documents", "metadatas", "distances"]
-            )
-
-            search_results = []
-            if results['documents'] and results['documents'][0]:
-                for doc, metadata, distance in zip(
-                        results['documents'][0],
-                        results['metadatas'][0],
-                        results['distances'][0]
-                ):
-                    similarity = 1 - distance
-                    novel_title = metadata.get('title', 'Unknown')
-                    position = metadata.get('position', 0)
-                    search_results.append((doc, novel_title, position, similarity))
-
-            return search_results
+            return list(self._search_cache(query, top_k, novel_filter, self._cache_epoch))
 
         except Exception as e:
             print(f"Error during semantic search: {e}")
             return []
 
+    def _semantic_search_uncached(self, query: str, top_k: int, novel_filter: str,
+                                  cache_epoch: int) -> Tuple[Tuple[str, str, int, float], ...]:
+        """
+        Run a semantic search against ChromaDB. cache_epoch only keys the result cache.
+        """
+        # Build filter if novel is specified
+        where_filter = None
+        if novel_filter and novel_filter != "All Novels":
+            where_filter = {"title": novel_filter}
+
+        results = self.collection.query(
+            query_embeddings=[self._embed_query(query)],
+            n_results=top_k,
+            where=where_filter,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        search_results = []
+        if results['documents'] and results['documents'][0]:
+            for doc, metadata, distance in zip(
+                    results['documents'][0],
+                    results['metadatas'][0],
+                    results['distances'][0]
+            ):
+                similarity = 1 - distance  # ip distance on unit vectors is 1 - cosine
+                novel_title = metadata.get('title', 'Unknown')
+                position = metadata.get('position', 0)
+                search_results.append((doc, novel_title, position, similarity))
+
+        return tuple(search_results)
+
     def regular_search(self, query: str, case_sensitive: bool = False, novel_filter: str = None) -> List[
         Tuple[str, str, int]]:
         """
@@ -278,6 +546,8 @@ class NovelSearcher:
         if not case_sensitive:
             query = query.lower()
 
+        pattern = re.compile(re.escape(query))
+
         for filename, novel_data in self.novels.items():
             novel_title = novel_data["title"]
 
@@ -285,10 +555,24 @@ class NovelSearcher:
             if novel_filter and novel_filter != "All Novels" and novel_title != novel_filter:
                 continue
 
-            for i, sentence in enumerate(novel_data["sentences"]):
-                search_text = sentence if case_sensitive else sentence.lower()
-                if query in search_text:
-                    results.append((sentence, novel_title, i))
+            sentences = novel_data["sentences"]
+            if not sentences:
+                continue
+
+            if case_sensitive:
+                blob, offsets = novel_data["sentences_blob"], novel_data["sentence_offsets"]
+            else:
+                blob, offsets = novel_data["sentences_lower_blob"], novel_data["sentence_lower_offsets"]
+
+            # One regex scan over the joined novel; after a hit, resume at the next sentence
+            pos = 0
+            while pos <= len(blob):
+                match = pattern.search(blob, pos)
+                if match is None:
+                    break
+                i = bisect.bisect_right(offsets, match.start())
+                results.append((sentences[i], novel_title, i))
+                pos = offsets[i]
 
         return results
 
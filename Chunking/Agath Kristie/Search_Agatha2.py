@@ -1,21 +1,102 @@
-import re
 import os
+import sys
+import hashlib
+import sqlite3
+import numpy as np
+import torch
 import wx
 import wx.lib.mixins.listctrl as listmix
 import chromadb
 from sentence_transformers import SentenceTransformer
 from typing import List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+import queue
 import threading
 import time
 
 
+# Inner product over unit vectors; a denser HNSW graph built with a wider beam, searched with a narrow one
+_COLLECTION_METADATA = {
+    "hnsw:space": "ip",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 64
+}
+
+# Fingerprint of the novel files the database was last built from, kept next to it
+_FINGERPRINT_FILE = "corpus_fingerprint.txt"
+
+# Projects '!' and '?' onto '.' so one bytes.split() finds every sentence boundary
+_DELIMITER_TABLE = bytes.maketrans(b'!?', b'..')
+
+
+def _read_novel(filepath: str) -> bytes:
+    """Read a novel's raw bytes (runs in a thread pool)"""
+    with open(filepath, 'rb') as file:
+        return file.read()
+
+
+def _split_novel(item):
+    """Split one (filename, novel_data) item into sentences"""
+    filename, novel_data = item
+    sentences = []
+    for raw in novel_data["content"].translate(_DELIMITER_TABLE).split(b'.'):
+        # Decoding never lengthens a piece, so skip short ones before decoding
+        if len(raw.strip()) > 10:
+            sentence = raw.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n').strip()
+            if len(sentence) > 10:
+                sentences.append(sentence)
+
+    return filename, {
+        "title": novel_data["title"],
+        "sentences": sentences,
+        "filepath": novel_data["filepath"]
+    }
+
+
+class EmbeddingCache:
+    def __init__(self, db_path: str, model_name: str):
+        """Content-addressed float32 embedding cache in SQLite, keyed by hash(model name + sentence)"""
+        self.model_name = model_name
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB)")
+        self.conn.commit()
+
+    def key(self, sentence: str) -> bytes:
+        """16-byte cache key for a sentence under this model"""
+        return hashlib.blake2b(self.model_name.encode('utf-8') + b"\x00" + sentence.encode('utf-8'),
+                               digest_size=16).digest()
+
+    def get_many(self, keys: List[bytes], chunk_size: int = 500) -> Dict[bytes, np.ndarray]:
+        """Return the cached vectors for the given keys; misses are left out"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), chunk_size):
+            chunk = unique_keys[i:i + chunk_size]
+            rows = self.conn.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, vec in rows:
+                found[key] = np.frombuffer(vec, dtype=np.float32)
+        return found
+
+    def put_many(self, keys: List[bytes], vectors):
+        """Store float32 vectors for the given keys"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+            ((key, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in zip(keys, vectors))
+        )
+        self.conn.commit()
+
+
 class SmartNovelSearcher:
     def __init__(self, persist_directory: str = "./christie_db"):
         self.persist_directory = persist_directory
+        self.model_name = 'all-MiniLM-L6-v2'
         self.novels = {}
         self.model = None
         self.client = None
         self.collection = None
+        self.embedding_cache = None
         self.is_initialized = False
 
     def load_novels_from_folder(self, folder_path: str) -> Dict:
@@ -25,18 +106,22 @@ class SmartNovelSearcher:
         if not os.path.exists(folder_path):
             return novels
 
-        for filename in os.listdir(folder_path):
-            if filename.lower().endswith('.txt'):
+        filenames = [filename for filename in os.listdir(folder_path) if filename.lower().endswith('.txt')]
+
+        # Read the files concurrently so disk reads overlap
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = []
+            for filename in filenames:
                 filepath = os.path.join(folder_path, filename)
-                try:
-                    with open(filepath, 'r', encoding='utf-8', errors='ignore') as file:
-                        content = file.read()
+                futures.append((filename, filepath, executor.submit(_read_novel, filepath)))
 
+            for filename, filepath, future in futures:
+                try:
                     # Just get basic info, don't process sentences if DB exists
                     novels[filename] = {
                         "title": os.path.splitext(filename)[0],
                         "filepath": filepath,
-                        "content": content  # Store content for later processing if needed
+                        "content": future.result()  # Raw bytes, split into sentences later if needed
                     }
 
                 except Exception as e:
@@ -53,6 +138,10 @@ class SmartNovelSearcher:
             client = chromadb.PersistentClient(path=self.persist_directory)
             collection = client.get_collection("christie_novels")
 
+            if (collection.metadata or {}).get("hnsw:space") != "ip":
+                print("✗ Database uses an old distance metric and will be rebuilt")
+                return False
+
             # Check if collection has documents
             if collection.count() > 0:
                 print(f"✓ Found existing database with {collection.count()} documents")
@@ -65,13 +154,32 @@ class SmartNovelSearcher:
             print(f"✗ Database check failed: {e}")
             return False
 
+    @staticmethod
+    def _corpus_fingerprint(novels: Dict) -> str:
+        """Fingerprint the novel files from their names, modification times and sizes (no parsing)"""
+        entries = []
+        for filename, novel_data in novels.items():
+            stat = os.stat(novel_data["filepath"])
+            entries.append((filename, stat.st_mtime_ns, stat.st_size))
+        return hashlib.sha1(repr(sorted(entries)).encode('utf-8')).hexdigest()
+
     def _needs_reindexing(self, current_novels: Dict) -> bool:
         """Check if we need to reindex based on folder contents"""
         if not self._database_exists():
             return True
 
-        # If DB exists and is valid, we don't need to reindex
-        return False
+        # Re-ingest when a novel was added, removed or modified since the last build
+        try:
+            with open(os.path.join(self.persist_directory, _FINGERPRINT_FILE), 'r', encoding='utf-8') as file:
+                return file.read().strip() != self._corpus_fingerprint(current_novels)
+        except OSError:
+            return True
+
+    def _load_model(self) -> SentenceTransformer:
+        """Load the sentence model, in FP16 on CUDA"""
+        if torch.cuda.is_available():
+            return SentenceTransformer(self.model_name, device='cuda').half()
+        return SentenceTransformer(self.model_name)
 
     def initialize_from_existing_db(self) -> bool:
         """Initialize using existing database without processing files"""
@@ -79,7 +187,7 @@ class SmartNovelSearcher:
             print("Initializing from existing database...")
 
             # Load model
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = self._load_model()
 
             # Connect to existing DB
             self.client = chromadb.PersistentClient(path=self.persist_directory)
@@ -110,22 +218,25 @@ class SmartNovelSearcher:
             return False
 
         self.novels = novels
+        fingerprint = self._corpus_fingerprint(novels)
 
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = self._load_model()
         except Exception as e:
             return False
 
         try:
             self.client = chromadb.PersistentClient(path=self.persist_directory)
 
-            # Clear any existing collection
-            try:
+            # Keep the existing collection so unchanged sentences are not rewritten.
+            # Embeddings are unit length, so rank by inner product; rebuild older metric collections
+            self.collection = self.client.get_or_create_collection(
+                name="christie_novels", metadata=_COLLECTION_METADATA)
+            if (self.collection.metadata or {}).get("hnsw:space") != "ip":
                 self.client.delete_collection("christie_novels")
-            except:
-                pass
-
-            self.collection = self.client.create_collection(name="christie_novels")
+                self.collection = self.client.create_collection(name="christie_novels", metadata=_COLLECTION_METADATA)
+            self.embedding_cache = EmbeddingCache(
+                os.path.join(self.persist_directory, "embedding_cache.sqlite3"), self.model_name)
         except Exception as e:
             return False
 
@@ -133,6 +244,11 @@ class SmartNovelSearcher:
         success = self._store_embeddings_batched(progress_callback)
         if success:
             self.is_initialized = True
+            try:
+                with open(os.path.join(self.persist_directory, _FINGERPRINT_FILE), 'w', encoding='utf-8') as file:
+                    file.write(fingerprint)
+            except OSError as e:
+                print(f"Could not save corpus fingerprint: {e}")
         return success
 
     def _store_embeddings_batched(self, progress_callback=None) -> bool:
@@ -145,66 +261,134 @@ class SmartNovelSearcher:
             total_sentences = 0
             processed_novels = {}
 
-            # First pass: count total sentences and process novel info
-            for filename, novel_data in self.novels.items():
-                content = novel_data["content"]
-                sentences = re.split(r'[.!?]+', content)
-                sentences = [s.strip() for s in sentences if s.strip() and len(s.strip()) > 10]
-
-                processed_novels[filename] = {
-                    "title": novel_data["title"],
-                    "sentences": sentences,
-                    "filepath": novel_data["filepath"]
-                }
-                total_sentences += len(sentences)
+            # First pass: split novels into sentences and count them
+            for filename, novel_data in map(_split_novel, self.novels.items()):
+                processed_novels[filename] = novel_data
+                total_sentences += len(novel_data["sentences"])
 
             self.novels = processed_novels
-            processed = 0
 
-            # Second pass: create embeddings
+            # Second pass: encode every sentence across all novels in large batches.
+            # IDs are content hashes, so a sentence keeps its ID when others shift around it
+            occurrences = {}
             for filename, novel_data in self.novels.items():
-                sentences = novel_data["sentences"]
-                title = novel_data["title"]
-
-                # Process in batches
-                for i in range(0, len(sentences), 16):
-                    batch = sentences[i:i + 16]
-                    embeddings = self.model.encode(batch).tolist()
-
-                    for j, (sentence, embedding) in enumerate(zip(batch, embeddings)):
-                        all_documents.append(sentence)
-                        all_metadatas.append({
-                            "filename": filename,
-                            "title": title,
-                            "position": i + j
-                        })
-                        all_ids.append(f"{filename}_{i + j}")
-
-                    processed += len(batch)
-                    if progress_callback:
-                        progress_callback(processed, total_sentences, f"Processing {title}")
-
-            # Store in batches
-            for i in range(0, len(all_documents), 50):
-                end_idx = min(i + 50, len(all_documents))
-                batch_docs = all_documents[i:end_idx]
-                batch_meta = all_metadatas[i:end_idx]
-                batch_ids = all_ids[i:end_idx]
-
-                # Get embeddings for this batch
-                batch_embeddings = self.model.encode(batch_docs).tolist()
-
-                self.collection.add(
-                    documents=batch_docs,
-                    metadatas=batch_meta,
-                    ids=batch_ids,
-                    embeddings=batch_embeddings
+                # Every metadata dict of a novel shares one interned filename and title string
+                filename = sys.intern(filename)
+                title = sys.intern(novel_data["title"])
+                for position, sentence in enumerate(novel_data["sentences"]):
+                    digest = hashlib.blake2b(f"{title}\x00{sentence}".encode('utf-8'), digest_size=12).hexdigest()
+                    repeat = occurrences.get(digest, 0)
+                    occurrences[digest] = repeat + 1
+
+                    all_documents.append(sentence)
+                    all_metadatas.append({
+                        "filename": filename,
+                        "title": title,
+                        "position": position
+                    })
+                    all_ids.append(digest if repeat == 0 else f"{digest}_{repeat}")
+
+            # Store in large batches, capped by what the client accepts in one call
+            batch_size = 5000
+            if hasattr(self.client, 'get_max_batch_size'):
+                batch_size = min(batch_size, self.client.get_max_batch_size())
+
+            # Drop rows that no longer exist and skip rows that are already stored unchanged
+            existing = self.collection.get(include=["metadatas"])
+            stored_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+            current_ids = set(all_ids)
+            stale_ids = [doc_id for doc_id in stored_metadata if doc_id not in current_ids]
+            for i in range(0, len(stale_ids), batch_size):
+                self.collection.delete(ids=stale_ids[i:i + batch_size])
+
+            # Sentences that only moved get a metadata-only update; their vectors stay in the index
+            moved = [row for row, doc_id in enumerate(all_ids)
+                     if doc_id in stored_metadata and stored_metadata[doc_id] != all_metadatas[row]]
+            for i in range(0, len(moved), batch_size):
+                rows = moved[i:i + batch_size]
+                self.collection.update(
+                    ids=[all_ids[row] for row in rows],
+                    metadatas=[all_metadatas[row] for row in rows]
                 )
 
-                if progress_callback and i % 500 == 0:
-                    progress_callback(i, len(all_documents), "Storing embeddings")
+            changed = [row for row, doc_id in enumerate(all_ids) if doc_id not in stored_metadata]
+            all_documents = [all_documents[row] for row in changed]
+            all_metadatas = [all_metadatas[row] for row in changed]
+            all_ids = [all_ids[row] for row in changed]
+
+            # Look every sentence up in the embedding cache; misses are encoded batch by batch below
+            keys = [self.embedding_cache.key(sentence) for sentence in all_documents]
+            embeddings_by_key = self.embedding_cache.get_many(keys)
+            dimension = self.model.get_sentence_embedding_dimension()
+
+            # A storage thread writes batch N to Chroma while this thread encodes batch N + 1
+            write_queue = queue.Queue(maxsize=2)
+            write_errors = []
+
+            def writer():
+                while (batch := write_queue.get()) is not None:
+                    if write_errors:
+                        continue
+                    try:
+                        end_idx = batch.pop("end")
+                        self.collection.upsert(**batch)
+                        if progress_callback:
+                            progress_callback(end_idx, len(all_documents), "Storing embeddings")
+                    except Exception as e:
+                        write_errors.append(e)
+
+            writer_thread = threading.Thread(target=writer, daemon=True)
+            writer_thread.start()
+
+            encode_batch_size = 256
+            try:
+                for i in range(0, len(all_documents), batch_size):
+                    if write_errors:
+                        break
+                    end_idx = min(i + batch_size, len(all_documents))
+                    batch_keys = keys[i:end_idx]
+
+                    missing = {}
+                    for key, sentence in zip(batch_keys, all_documents[i:end_idx]):
+                        if key not in embeddings_by_key:
+                            missing.setdefault(key, sentence)
+
+                    if missing:
+                        missing_keys = list(missing.keys())
+                        missing_embeddings = self.model.encode(
+                            list(missing.values()),
+                            batch_size=encode_batch_size,
+                            convert_to_numpy=True,
+                            normalize_embeddings=True,
+                            show_progress_bar=False
+                        )
+                        self.embedding_cache.put_many(missing_keys, missing_embeddings)
+                        embeddings_by_key.update(zip(missing_keys, missing_embeddings))
+
+                    # One contiguous float32 (rows, dim) block per batch, handed straight to Chroma
+                    batch_embeddings = np.empty((len(batch_keys), dimension), dtype=np.float32)
+                    for row, key in enumerate(batch_keys):
+                        batch_embeddings[row] = embeddings_by_key[key]
+
+                    write_queue.put({
+                        "documents": all_documents[i:end_idx],
+                        "metadatas": all_metadatas[i:end_idx],
+                        "ids": all_ids[i:end_idx],
+                        "embeddings": batch_embeddings,
+                        "end": end_idx
+                    })
+
+                    if progress_callback:
+                        progress_callback(end_idx, len(all_documents), "Encoding sentences")
+            finally:
+                write_queue.put(None)
+                writer_thread.join()
+
+            if write_errors:
+                raise write_errors[0]
 
-            print(f"✓ Created new database with {len(all_documents)} documents")
+            print(f"✓ Database ready with {self.collection.count()} documents "
+                  f"({len(all_documents)} new, {len(moved)} moved)")
             return True
 
         except Exception as e:
@@ -218,8 +402,9 @@ class SmartNovelSearcher:
         try:
             where_filter = {"title": novel_filter} if novel_filter and novel_filter != "All" else None
 
+            query_embedding = self.model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=query_embedding,
                 n_results=min(top_k, 20),
                 where=where_filter,
                 include=["documents", "metadatas", "distances"]
@@ -233,7 +418,7 @@ class SmartNovelSearcher:
                         doc,
                         metadata.get('title', 'Unknown'),
                         metadata.get('position', 0),
-                        1 - distance
+                        1 - distance  # ip distance on unit vectors is 1 - cosine
                     ))
 
             return search_results
@@ -436,18 +621,20 @@ class SmartChristieSearch(wx.Frame):
         def progress_callback(current, total, msg):
             wx.CallAfter(self.update_progress, current, total, msg)
 
-        # Check if we can use existing database
-        if self.searcher._database_exists():
-            wx.CallAfter(self.on_processing_done, True, 0, "Using existing database")
-            return
-
-        # Otherwise, process novels and create new database
         novels = self.searcher.load_novels_from_folder(path)
-        if novels:
-            success = self.searcher.initialize_with_novels(novels, progress_callback)
-            wx.CallAfter(self.on_processing_done, success, len(novels), "Created new database")
-        else:
+        if not novels:
             wx.CallAfter(self.on_processing_done, False, 0, "No novels found")
+            return
+
+        # Use the existing database when it was built from these exact files
+        if not self.searcher._needs_reindexing(novels):
+            if self.searcher.is_initialized or self.searcher.initialize_from_existing_db():
+                wx.CallAfter(self.on_processing_done, True, len(novels), "Using existing database")
+                return
+
+        # Otherwise update the database: only new or changed sentences are encoded and written
+        success = self.searcher.initialize_with_novels(novels, progress_callback)
+        wx.CallAfter(self.on_processing_done, success, len(novels), "Updated database")
 
     def update_progress(self, current, total, msg):
         if total > 0:
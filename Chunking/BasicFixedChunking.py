@@ -6,19 +6,9 @@ def fixed_size_chunking(text, chunk_size=1000, overlap=0):
     """
     Split text into chunks of fixed size with optional overlap
     """
-    chunks = []
-    start = 0
-
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-
-        if len(chunk.strip()) > 0:  # Only add non-empty chunks
-            chunks.append(chunk.strip())
-
-        start += chunk_size - overlap
-
-    return chunks
+    # All chunk starts come from one range(); each slice is stripped once
+    stripped = (text[start:start + chunk_size].strip() for start in range(0, len(text), chunk_size - overlap))
+    return [chunk for chunk in stripped if chunk]  # Only add non-empty chunks
 
 
 def read_file(filename):
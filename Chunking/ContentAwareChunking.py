@@ -1,26 +1,34 @@
 # content_aware_chunking.py
 import re
 
+# Markdown headings (#, ##, ###) and uppercase heading lines
+_HEADING_RE = re.compile(r'^(#{1,3}[ \t]+.+|[A-Z][A-Z \t]{10,}:|[A-Z][A-Z \t]+)[ \t]*$', re.MULTILINE)
+
 
 def heading_based_chunking(text):
     """
     Split text based on headings (Markdown-style or uppercase headings)
     """
-    # Pattern for markdown headings (#, ##, ###) and uppercase headings
-    heading_pattern = r'(?:\n|^)(#{1,3}\s+.+?|\n[A-Z][A-Z\s]{10,}:\n|\n[A-Z][A-Z\s]+\n)'
-
     chunks = []
-    sections = re.split(heading_pattern, text)
-    headings = re.findall(heading_pattern, text)
+    section_start = 0
+    heading = None
 
-    # Combine headings with their content
-    for i, section in enumerate(sections):
+    # Walk the headings once; the body of each runs up to the next heading
+    for match in _HEADING_RE.finditer(text):
+        section = text[section_start:match.start()]
         if section.strip():
-            if i == 0 and not section.startswith('#'):
+            if heading is None:
                 # First section without heading
                 chunks.append(("Introduction", section))
-            elif i > 0 and i - 1 < len(headings):
-                chunks.append((headings[i - 1].strip(), section))
+            else:
+                chunks.append((heading, section))
+
+        heading = match.group(1).strip()
+        section_start = match.end()
+
+    section = text[section_start:]
+    if section.strip():
+        chunks.append(("Introduction" if heading is None else heading, section))
 
     return chunks
 
@@ -1,26 +1,103 @@
 # semantic_chunking.py
-from langchain.text_splitter import RecursiveCharacterTextSplitter, CharacterTextSplitter
 
+_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
 
-def recursive_character_chunking(text, chunk_size=1000, chunk_overlap=200):
+
+def _split_keeping_separator(text, separator):
     """
-    Use recursive character splitting to keep related text together
+    Split text on a literal separator, keeping the separator at the start of each following piece
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""]
-    )
+    if not separator:
+        return list(text)
 
-    chunks = text_splitter.split_text(text)
+    pieces = text.split(separator)
+    splits = [pieces[0]] + [separator + piece for piece in pieces[1:]]
+    return [s for s in splits if s]
+
+
+def _merge_splits(splits, chunk_size, chunk_overlap):
+    """
+    Greedily pack small splits into chunks of at most chunk_size, carrying up to
+    chunk_overlap characters of trailing splits into the next chunk
+    """
+    chunks = []
+    current = []
+    lengths = []
+    first = 0  # current[first:] is the chunk being built
+    total = 0
+
+    for split in splits:
+        length = len(split)
+        if total + length > chunk_size and first < len(current):
+            chunk = "".join(current[first:]).strip()
+            if chunk:
+                chunks.append(chunk)
+
+            # Drop leading splits until only the overlap is left and the next split fits
+            while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                total -= lengths[first]
+                first += 1
+
+        current.append(split)
+        lengths.append(length)
+        total += length
+
+    chunk = "".join(current[first:]).strip()
+    if chunk:
+        chunks.append(chunk)
     return chunks
 
 
+def _recursive_split(text, separators, chunk_size, chunk_overlap):
+    """
+    Split on the coarsest separator present; recurse with finer separators into pieces that are still too long
+    """
+    separator = separators[-1]
+    finer_separators = []
+    for i, candidate in enumerate(separators):
+        if not candidate:
+            separator = candidate
+            break
+        if candidate in text:
+            separator = candidate
+            finer_separators = separators[i + 1:]
+            break
+
+    chunks = []
+    small_splits = []
+    for split in _split_keeping_separator(text, separator):
+        if len(split) < chunk_size:
+            small_splits.append(split)
+            continue
+
+        if small_splits:
+            chunks.extend(_merge_splits(small_splits, chunk_size, chunk_overlap))
+            small_splits = []
+        if finer_separators:
+            chunks.extend(_recursive_split(split, finer_separators, chunk_size, chunk_overlap))
+        else:
+            chunks.append(split)
+
+    if small_splits:
+        chunks.extend(_merge_splits(small_splits, chunk_size, chunk_overlap))
+    return chunks
+
+
+def recursive_character_chunking(text, chunk_size=1000, chunk_overlap=200):
+    """
+    Use recursive character splitting to keep related text together.
+    Same chunks as LangChain's RecursiveCharacterTextSplitter with
+    separators ["\n\n", "\n", ". ", " ", ""], without its per-split overhead.
+    """
+    return _recursive_split(text, _SEPARATORS, chunk_size, chunk_overlap)
+
+
 def character_chunking(text, chunk_size=1000, chunk_overlap=200):
     """
     Simple character-based chunking with LangChain
     """
+    from langchain.text_splitter import CharacterTextSplitter
+
     text_splitter = CharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
@@ -1,9 +1,14 @@
 import re
+import bisect
+import functools
+import itertools
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Tuple
 
+# Joins the sentences into one searchable text; a query containing it falls back to per-sentence checks
+_SENTENCE_SEPARATOR = "\x00"
+
 
 class TextSearcher:
     def __init__(self, file_path: str):
@@ -15,9 +20,13 @@ class TextSearcher:
         """
         self.file_path = file_path
         self.sentences = self._load_and_split_text()
+        self._build_search_text()
         self.model = None
         self.embeddings = None
 
+        # Repeated queries skip the transformer forward pass
+        self._embed_query = functools.lru_cache(maxsize=128)(self._encode_query)
+
     def _load_and_split_text(self) -> List[str]:
         """
         Load the text file and split it into sentences.
@@ -31,8 +40,8 @@ class TextSearcher:
 
             # Split text into sentences (simple approach)
             sentences = re.split(r'[.!?]+', text)
-            # Remove empty strings and strip whitespace
-            sentences = [s.strip() for s in sentences if s.strip()]
+            # Strip whitespace once per sentence and remove empty strings
+            sentences = [s for s in map(str.strip, sentences) if s]
             return sentences
 
         except FileNotFoundError:
@@ -51,11 +60,23 @@ class TextSearcher:
             print("Loading semantic search model...")
             self.model = SentenceTransformer('all-MiniLM-L6-v2')
             print("Computing embeddings...")
-            self.embeddings = self.model.encode(self.sentences)
+            # Unit-length rows, so cosine similarity is a plain dot product
+            self.embeddings = self.model.encode(
+                self.sentences, normalize_embeddings=True, convert_to_numpy=True
+            ).astype(np.float32)
             print("Semantic search ready!")
         except Exception as e:
             print(f"Error initializing semantic search: {e}")
 
+    def _encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a query into a read-only unit-length float32 vector (cached through self._embed_query).
+        """
+        query_embedding = self.model.encode([query], normalize_embeddings=True, convert_to_numpy=True)[0]
+        query_embedding = query_embedding.astype(np.float32)
+        query_embedding.setflags(write=False)
+        return query_embedding
+
     def regular_search(self, query: str, case_sensitive: bool = False) -> List[Tuple[str, int]]:
         """
         Perform regular text search (keyword matching).
@@ -72,13 +93,48 @@ class TextSearcher:
         if not case_sensitive:
             query = query.lower()
 
-        for i, sentence in enumerate(self.sentences):
-            search_text = sentence if case_sensitive else sentence.lower()
-            if query in search_text:
-                results.append((sentence, i))
+        if not self.sentences:
+            return results
+
+        if _SENTENCE_SEPARATOR in query:
+            # Could match across the separator; check each sentence on its own
+            for i, sentence in enumerate(self.sentences):
+                search_text = sentence if case_sensitive else sentence.lower()
+                if query in search_text:
+                    results.append((sentence, i))
+            return results
+
+        # One linear str.find scan of the joined text per match instead of a Python-level test per sentence
+        search_text = self._search_text if case_sensitive else self._search_text_lower
+        offsets = self._sentence_offsets[0 if case_sensitive else 1]
+        start = 0
+        while True:
+            found = search_text.find(query, start)
+            if found < 0:
+                break
+            i = bisect.bisect_right(offsets, found) - 1
+            results.append((self.sentences[i], i))
+            if i + 1 >= len(self.sentences):
+                break
+            start = offsets[i + 1]  # next sentence, so each is reported once
 
         return results
 
+    def _build_search_text(self):
+        """
+        Join the sentences (and their lowercase forms) into single strings for regular search,
+        recording where each sentence starts.
+        """
+        lowered = [sentence.lower() for sentence in self.sentences]
+        self._search_text = _SENTENCE_SEPARATOR.join(self.sentences)
+        self._search_text_lower = _SENTENCE_SEPARATOR.join(lowered)
+
+        # Lowercasing can change a sentence's length, so each text has its own offsets
+        self._sentence_offsets = [
+            list(itertools.accumulate((len(text) + 1 for text in texts[:-1]), initial=0))
+            for texts in (self.sentences, lowered)
+        ]
+
     def semantic_search(self, query: str, top_k: int = 5) -> List[Tuple[str, int, float]]:
         """
         Perform semantic search using sentence embeddings.
@@ -95,13 +151,17 @@ class TextSearcher:
             return []
 
         # Encode the query
-        query_embedding = self.model.encode([query])
+        query_embedding = self._embed_query(query)
 
-        # Compute cosine similarity
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
+        # Cosine similarity of unit vectors: one matrix-vector product
+        similarities = self.embeddings @ query_embedding
 
-        # Get top-k results
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        # Get top-k results: partial selection, then sort only the k winners
+        top_k = min(top_k, len(similarities))
+        if top_k <= 0:
+            return []
+        top_indices = np.argpartition(-similarities, top_k - 1)[:top_k]
+        top_indices = top_indices[np.argsort(-similarities[top_indices])]
 
         results = []
         for idx in top_indices:
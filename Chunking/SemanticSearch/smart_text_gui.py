@@ -1,12 +1,139 @@
-import re
 import os
+import sys
+
+# Let the Rust tokenizer use every core for batch encodes (set before the
+# tokenizers library is imported; an explicit user setting still wins)
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+
+import json
+import bisect
+import hashlib
+import itertools
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
 import wx
 import wx.lib.mixins.listctrl as listmix
 import chromadb
+from chromadb import EmbeddingFunction
+from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 from typing import List, Tuple, Dict
 import threading
 import time
+import queue
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Sidecar files written next to the Chroma database
+_EMBEDDINGS_FILE = "embeddings.f32"
+_EMBEDDINGS_META_FILE = "embeddings.json"
+_EMBEDDINGS_HASHES_FILE = "embeddings_hashes.npy"
+_SQ8_CODES_FILE = "embeddings_sq8.i8"
+_SQ8_PARAMS_FILE = "embeddings_sq8.npz"
+_BINARY_CODES_FILE = "embeddings_binary.u8"
+_HNSW_INDEX_FILE = "hnsw_index.bin"
+_QUERY_CACHE_FILE = "query_cache.npz"
+
+# Query embeddings kept in memory (and on disk between sessions)
+_QUERY_CACHE_SIZE = 512
+
+# Dimensions kept by the PCA projection in front of the int8 index
+_PCA_COMPONENTS = 64
+
+# Corpora up to this many sentences are scored exactly against every embedding;
+# larger ones go through the in-process HNSW graph when hnswlib is installed
+_EXACT_SCAN_LIMIT = 200_000
+_HNSW_M = 16
+_HNSW_EF_CONSTRUCTION = 200
+_HNSW_EF_SEARCH = 64
+
+# Separates sentences in the joined text used by regular search
+_SENTENCE_SEPARATOR = "\x00"
+
+# Below this many sentences, starting tokenizer worker processes costs more than it saves
+_LOADER_WORKER_MIN_SENTENCES = 10_000
+
+# Loaded sentence models, shared by every searcher so switching files skips the reload
+_MODEL_NAME = 'all-MiniLM-L6-v2'
+_MODEL_CACHE = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+class _SentenceTransformerEmbedding(EmbeddingFunction):
+    """Chroma embedding function backed by the searcher's already-loaded model,
+    so Chroma never loads a second copy of MiniLM for documents or query texts"""
+
+    def __init__(self, model: SentenceTransformer):
+        self.model = model
+
+    def __call__(self, input):
+        return self.model.encode(
+            list(input), normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False
+        ).tolist()
+
+
+def _sentence_hashes(sentences: List[str]) -> np.ndarray:
+    """64-bit content hash of every sentence (xxh64 when xxhash is installed)"""
+    if xxhash is not None:
+        digests = (xxhash.xxh64_intdigest(sentence) for sentence in sentences)
+    else:
+        digests = (
+            int.from_bytes(hashlib.blake2b(sentence.encode('utf-8'), digest_size=8).digest(), 'little')
+            for sentence in sentences
+        )
+    return np.fromiter(digests, dtype=np.uint64, count=len(sentences))
+
+
+def _tokenizer_worker_init(worker_id: int):
+    """Keep each DataLoader worker's tokenizer single-threaded: a forked child
+    must not reuse the parent's tokenizer thread pool, and the workers already
+    run in parallel with each other"""
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _dot_scores(embeddings, query):
+        """Dot product of every embedding row with the query, compiled to SIMD loops spread over the cores"""
+        scores = np.empty(embeddings.shape[0], dtype=np.float32)
+        for i in numba.prange(embeddings.shape[0]):
+            total = np.float32(0.0)
+            for d in range(embeddings.shape[1]):
+                total += embeddings[i, d] * query[d]
+            scores[i] = total
+        return scores
+else:
+    _dot_scores = None
+
+
+class _TokenizeBatch:
+    """DataLoader collate function that tokenizes a batch of sentences in the worker process"""
+
+    def __init__(self, tokenizer, max_length: int):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+
+    def __call__(self, batch: List[str]) -> Dict:
+        return dict(self.tokenizer(
+            batch, padding=True, truncation='longest_first', max_length=self.max_length, return_tensors='pt'
+        ))
 
 
 class VectorTextSearcher:
@@ -17,9 +144,21 @@ class VectorTextSearcher:
         self.file_path = file_path
         self.persist_directory = persist_directory
         self.sentences = []
+        self._search_text = ""
+        self._search_text_lower = ""
+        self._sentence_offsets = None
+        self._last_regular = None
         self.model = None
         self.client = None
         self.collection = None
+        self.embeddings = None
+        self.ann_index = None
+        self.embeddings_sq8 = None
+        self.sq8_min = None
+        self.sq8_scale = None
+        self.pca_components = None
+        self.embeddings_binary = None
+        self._query_cache = OrderedDict()
         self.is_initialized = False
 
     def set_file_path(self, file_path: str):
@@ -27,6 +166,9 @@ class VectorTextSearcher:
         self.file_path = file_path
         self.is_initialized = False
         self.sentences = []
+        self._search_text = self._search_text_lower = ""
+        self._sentence_offsets = None
+        self._last_regular = None
 
     def _load_and_split_text(self) -> List[str]:
         """
@@ -36,14 +178,21 @@ class VectorTextSearcher:
             return []
 
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
-
-            # Split text into sentences
-            sentences = re.split(r'[.!?]+', text)
-            # Remove empty strings and strip whitespace
-            sentences = [s.strip() for s in sentences if s.strip()]
-            return sentences
+            with open(self.file_path, 'rb') as file:
+                data = file.read()
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+            # Split text into sentences: find every '.', '!' and '?' byte in one
+            # vectorised pass (none of them can occur inside a UTF-8 multi-byte sequence)
+            buf = np.frombuffer(data, dtype=np.uint8)
+            cuts = np.flatnonzero((buf == 0x2E) | (buf == 0x21) | (buf == 0x3F))
+            starts = np.concatenate(([0], cuts + 1))
+            ends = np.concatenate((cuts, [len(buf)]))
+            keep = ends > starts  # runs of delimiters leave empty pieces
+
+            # Decode each piece, strip whitespace and remove empty strings
+            sentences = (data[a:b].decode('utf-8').strip() for a, b in zip(starts[keep].tolist(), ends[keep].tolist()))
+            return [s for s in sentences if s]
 
         except Exception as e:
             print(f"Error loading file: {e}")
@@ -57,15 +206,49 @@ class VectorTextSearcher:
             return True
 
         try:
-            client = chromadb.PersistentClient(path=self.persist_directory)
+            client = self._open_client()
             collection = client.get_collection("text_embeddings")
-            if collection.count() == 0:
+            count = collection.count()
+            if count == 0:
+                return True
+            # Rows are unit length, so Chroma must rank by inner product (1 - distance is then cosine)
+            if (collection.metadata or {}).get("hnsw:space") != "ip":
+                return True
+            # The int8 index must exist and cover the same rows as the collection
+            with np.load(self._sidecar_path(_SQ8_PARAMS_FILE)) as params:
+                if 'components' not in params or int(params['shape'][0]) != count:
+                    return True
+            if not os.path.exists(self._sidecar_path(_BINARY_CODES_FILE)):
+                return True
+            # So must the float32 copy, built from the file that is loaded now
+            with open(self._sidecar_path(_EMBEDDINGS_META_FILE), 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            if meta['source_file'] != self.file_path or meta['N'] != count or meta['N'] != len(self.sentences):
                 return True
         except:
             return True
 
         return False
 
+    def _load_model(self) -> SentenceTransformer:
+        """
+        Load the sentence model at reduced precision: FP16 on CUDA, the INT8 ONNX export on CPU.
+        Falls back to the plain FP32 model when onnxruntime or the quantized file is unavailable.
+        """
+        if torch.cuda.is_available():
+            return SentenceTransformer(_MODEL_NAME, device='cuda').half()
+
+        try:
+            return SentenceTransformer(
+                _MODEL_NAME,
+                device='cpu',
+                backend='onnx',
+                model_kwargs={"file_name": "onnx/model_qint8_avx512_vnni.onnx"}
+            )
+        except Exception as e:
+            print(f"INT8 ONNX model unavailable, using FP32: {e}")
+            return SentenceTransformer(_MODEL_NAME, device='cpu')
+
     def initialize(self, progress_callback=None) -> bool:
         """
         Initialize the system with progress callback for GUI.
@@ -77,110 +260,432 @@ class VectorTextSearcher:
         self.sentences = self._load_and_split_text()
         if not self.sentences:
             return False
+        self._build_search_text()
 
-        # Initialize model
+        # Initialize model (loaded once per process)
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            with _MODEL_CACHE_LOCK:
+                if _MODEL_NAME not in _MODEL_CACHE:
+                    _MODEL_CACHE[_MODEL_NAME] = self._load_model()
+            self.model = _MODEL_CACHE[_MODEL_NAME]
         except Exception as e:
             print(f"Error loading model: {e}")
             return False
 
         # Initialize ChromaDB
         try:
-            self.client = chromadb.PersistentClient(path=self.persist_directory)
-            self.collection = self.client.get_or_create_collection(
-                name="text_embeddings",
-                metadata={"description": "Text embeddings for semantic search"}
-            )
+            self.client = self._open_client()
+            try:
+                self.collection = self._get_or_create_collection()
+            except ValueError:
+                # Built with Chroma's default embedder; start over so it is indexed with ours
+                self.client.delete_collection("text_embeddings")
+                self.collection = self._get_or_create_collection()
         except Exception as e:
             print(f"Error initializing ChromaDB: {e}")
             return False
 
+        self._load_query_cache()
+
         # Check if we need to compute embeddings
         if self._needs_reindexing():
             success = self._store_embeddings_batched(progress_callback)
             if not success:
                 return False
 
+        if self._load_embeddings():
+            self._load_hnsw_index()
+            if _dot_scores is not None:
+                # Compile the scan kernel now rather than on the first search
+                warmup_query = np.zeros(self.embeddings.shape[1], dtype=np.float32)
+                warmup_query.setflags(write=False)
+                _dot_scores(self.embeddings[:1], warmup_query)
+        if self._load_sq8_index():
+            self._load_binary_index()
+
         self.is_initialized = True
         return True
 
+    def _open_client(self):
+        """Persistent Chroma client for the database directory, with telemetry turned off"""
+        return chromadb.PersistentClient(
+            path=self.persist_directory, settings=Settings(anonymized_telemetry=False)
+        )
+
+    def _get_or_create_collection(self):
+        """Open the collection with an embedding function that shares self.model"""
+        return self.client.get_or_create_collection(
+            name="text_embeddings",
+            metadata={"description": "Text embeddings for semantic search", "hnsw:space": "ip"},
+            embedding_function=_SentenceTransformerEmbedding(self.model)
+        )
+
     def _store_embeddings_batched(self, progress_callback=None) -> bool:
         """
         Compute embeddings and store them in ChromaDB with progress updates.
         """
         try:
+            # Sentences the previous build already embedded are copied over by
+            # content hash, so only new or edited ones go through the model
+            hashes = _sentence_hashes(self.sentences)
+            embedding_matrix, reused_rows = self._reuse_previous_embeddings(hashes)
+
+            # Drop the memory maps so their files can be rewritten (Windows
+            # refuses to truncate a file that is still mapped)
+            self.embeddings = self.embeddings_sq8 = self.embeddings_binary = None
+            self.ann_index = None
+
             # Clear existing collection
             try:
                 self.client.delete_collection("text_embeddings")
             except:
                 pass
 
-            self.collection = self.client.get_or_create_collection(
-                name="text_embeddings",
-                metadata={"description": "Text embeddings for semantic search"}
-            )
+            self.collection = self._get_or_create_collection()
 
             # Batch sizes
-            embedding_batch_size = 32
-            db_batch_size = 100
-
-            all_documents = []
-            all_metadatas = []
-            all_ids = []
-            all_embeddings = []
+            embedding_batch_size = 64
+            progress_interval = 2048
+            db_batch_size = self.client.get_max_batch_size()  # fewest add calls the backend accepts
+            max_pending_writes = 2
 
             total_sentences = len(self.sentences)
 
-            # Process embeddings in batches
-            for i in range(0, total_sentences, embedding_batch_size):
-                batch_sentences = self.sentences[i:i + embedding_batch_size]
-
-                # Compute embeddings for this batch
-                batch_embeddings = self.model.encode(batch_sentences).tolist()
-                all_embeddings.extend(batch_embeddings)
-
-                # Prepare documents for this batch
-                for j, sentence in enumerate(batch_sentences):
-                    absolute_index = i + j
-                    all_documents.append(sentence)
-                    all_metadatas.append({
-                        "position": absolute_index,
-                        "length": len(sentence),
-                        "source_file": self.file_path
-                    })
-                    all_ids.append(f"doc_{absolute_index}")
-
-                # Update progress
-                if progress_callback:
-                    progress = min(i + embedding_batch_size, total_sentences)
-                    progress_callback(progress, total_sentences, "Processing sentences")
-
-            # Store in database in smaller batches
-            for i in range(0, len(all_documents), db_batch_size):
-                end_idx = min(i + db_batch_size, len(all_documents))
-
-                batch_documents = all_documents[i:end_idx]
-                batch_metadatas = all_metadatas[i:end_idx]
-                batch_ids = all_ids[i:end_idx]
-                batch_embeddings = all_embeddings[i:end_idx]
-
-                self.collection.add(
-                    documents=batch_documents,
-                    metadatas=batch_metadatas,
-                    ids=batch_ids,
-                    embeddings=batch_embeddings
-                )
-
-                if progress_callback:
-                    progress_callback(end_idx, len(all_documents), "Storing embeddings")
+            # Metadata columns, turned into Chroma's per-row dicts one batch at a time
+            lengths = np.fromiter(map(len, self.sentences), dtype=np.int64, count=total_sentences)
+            source_file = sys.intern(self.file_path)
+
+            # Encode in order of sentence length so each batch pads to a similar
+            # length; DataLoader workers tokenize the next batches while the
+            # model runs the current one, and a writer thread adds finished
+            # rows to ChromaDB in the meantime
+            reused = set(reused_rows)
+            order = sorted(
+                (i for i in range(total_sentences) if i not in reused),
+                key=lambda i: len(self.sentences[i].split())
+            )
+            device = self.model.device
+
+            num_workers = 0
+            previous_threads = torch.get_num_threads()
+            if total_sentences >= _LOADER_WORKER_MIN_SENTENCES:
+                num_workers = max(0, min(2, (os.cpu_count() or 1) - 1))
+            if num_workers and device.type == 'cpu':
+                # Leave cores for the tokenizer workers
+                torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+
+            loader = DataLoader(
+                self.sentences,
+                batch_size=embedding_batch_size,
+                sampler=order,
+                num_workers=num_workers,
+                collate_fn=_TokenizeBatch(self.model.tokenizer, self.model.max_seq_length),
+                worker_init_fn=_tokenizer_worker_init,
+                pin_memory=device.type == 'cuda'
+            )
 
+            unsaved_rows = []
+            pending_writes = []
+
+            self.model.eval()
+            try:
+                with torch.inference_mode(), ThreadPoolExecutor(max_workers=1) as writer:
+                    # Reused rows are ready already; let the writer start on them
+                    for i in range(0, len(reused_rows), db_batch_size):
+                        pending_writes.append(
+                            writer.submit(
+                                self._add_rows, reused_rows[i:i + db_batch_size], embedding_matrix, lengths, source_file
+                            )
+                        )
+
+                    for batch_index, features in enumerate(loader):
+                        features = {name: value.to(device, non_blocking=True) for name, value in features.items()}
+                        batch_embeddings = self.model(features)['sentence_embedding']
+                        batch_embeddings = torch.nn.functional.normalize(batch_embeddings.float(), dim=1).cpu().numpy()
+
+                        # Scatter back to document order
+                        if embedding_matrix is None:
+                            embedding_matrix = np.empty((total_sentences, batch_embeddings.shape[1]), dtype=np.float32)
+                        start = batch_index * embedding_batch_size
+                        batch_rows = order[start:start + len(batch_embeddings)]
+                        embedding_matrix[batch_rows] = batch_embeddings
+
+                        # Hand full database batches to the writer, keeping only a
+                        # couple in flight so finished rows are not buffered for long
+                        unsaved_rows.extend(batch_rows)
+                        done = len(reused_rows) + start + len(batch_rows)
+                        while len(unsaved_rows) >= db_batch_size or (unsaved_rows and done == total_sentences):
+                            pending_writes.append(writer.submit(
+                                self._add_rows, unsaved_rows[:db_batch_size], embedding_matrix, lengths, source_file
+                            ))
+                            unsaved_rows = unsaved_rows[db_batch_size:]
+                            while len(pending_writes) > max_pending_writes:
+                                pending_writes.pop(0).result()
+
+                        # Update progress whenever an interval boundary is crossed; reused
+                        # rows offset `done`, so it rarely lands on a multiple exactly
+                        crossed = done // progress_interval > (done - len(batch_rows)) // progress_interval
+                        if progress_callback and (crossed or done == total_sentences):
+                            progress_callback(done, total_sentences, "Processing sentences")
+
+                    for write in pending_writes:
+                        write.result()
+            finally:
+                torch.set_num_threads(previous_threads)  # the thread count is process-wide
+
+            if progress_callback:
+                progress_callback(total_sentences, total_sentences, "Storing embeddings")
+
+            self._write_embeddings(embedding_matrix, hashes)
+            self._write_hnsw_index(embedding_matrix)
+            self._write_sq8_index(embedding_matrix)
+            self._write_binary_index(embedding_matrix)
             return True
 
         except Exception as e:
             print(f"Error storing embeddings: {e}")
             return False
 
+    def _add_rows(self, rows: List[int], embedding_matrix: np.ndarray, lengths: np.ndarray, source_file: str):
+        """
+        Add the given sentences, with their metadata and embeddings, to the collection.
+        """
+        self.collection.add(
+            documents=[self.sentences[i] for i in rows],
+            metadatas=[
+                {"position": i, "length": length, "source_file": source_file}
+                for i, length in zip(rows, lengths[rows].tolist())
+            ],
+            ids=[f"doc_{i}" for i in rows],
+            embeddings=embedding_matrix[rows].tolist()
+        )
+
+    def _sidecar_path(self, name: str) -> str:
+        """Path of a sidecar file inside the persist directory"""
+        return os.path.join(self.persist_directory, name)
+
+    def _reuse_previous_embeddings(self, hashes: np.ndarray) -> Tuple[np.ndarray, List[int]]:
+        """
+        Copy the embeddings of sentences whose hash appears in the previous build.
+        Returns the embedding matrix (None if nothing was reusable) and the rows filled in.
+        """
+        try:
+            with open(self._sidecar_path(_EMBEDDINGS_META_FILE), 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            if meta.get('model') != _MODEL_NAME:
+                return None, []
+            previous_hashes = np.load(self._sidecar_path(_EMBEDDINGS_HASHES_FILE))
+            if len(previous_hashes) != meta['N']:
+                return None, []
+            previous = np.memmap(
+                self._sidecar_path(_EMBEDDINGS_FILE), dtype=np.float32, mode='r', shape=(meta['N'], meta['D'])
+            )
+        except Exception:
+            return None, []
+
+        row_of_hash = dict(zip(previous_hashes.tolist(), range(len(previous_hashes))))
+        reused_rows, source_rows = [], []
+        for i, sentence_hash in enumerate(hashes.tolist()):
+            source = row_of_hash.get(sentence_hash)
+            if source is not None:
+                reused_rows.append(i)
+                source_rows.append(source)
+
+        if not reused_rows:
+            return None, []
+
+        embedding_matrix = np.empty((len(hashes), meta['D']), dtype=np.float32)
+        embedding_matrix[reused_rows] = previous[source_rows]
+        del previous  # release the map before the file is rewritten
+        return embedding_matrix, reused_rows
+
+    def _write_embeddings(self, embedding_matrix: np.ndarray, hashes: np.ndarray):
+        """
+        Save the float32 embeddings as one contiguous file, described by a small JSON header,
+        along with the content hash of each row.
+        """
+        embedding_matrix.tofile(self._sidecar_path(_EMBEDDINGS_FILE))
+        np.save(self._sidecar_path(_EMBEDDINGS_HASHES_FILE), hashes)
+        with open(self._sidecar_path(_EMBEDDINGS_META_FILE), 'w', encoding='utf-8') as file:
+            json.dump({
+                "N": int(embedding_matrix.shape[0]),
+                "D": int(embedding_matrix.shape[1]),
+                "source_file": self.file_path,
+                "model": _MODEL_NAME
+            }, file)
+
+    def _load_embeddings(self) -> bool:
+        """
+        Memory-map the float32 embeddings written by _write_embeddings.
+        """
+        self.embeddings = None
+        try:
+            with open(self._sidecar_path(_EMBEDDINGS_META_FILE), 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            if meta['source_file'] != self.file_path or meta['N'] != len(self.sentences):
+                return False
+            self.embeddings = np.memmap(
+                self._sidecar_path(_EMBEDDINGS_FILE), dtype=np.float32, mode='r', shape=(meta['N'], meta['D'])
+            )
+            return True
+        except Exception as e:
+            print(f"Float32 embeddings unavailable, rescoring through ChromaDB: {e}")
+            return False
+
+    def _write_sq8_index(self, embedding_matrix: np.ndarray):
+        """
+        Save an SQ8 copy of the embeddings: the centred vectors are projected onto
+        their top principal components, then each component is mapped from its
+        [min, max] range onto int8 codes, stored as a flat file for memory mapping.
+        """
+        # q . x = q . mean + (P q) . (P (x - mean)) up to the discarded components,
+        # so the reduced codes rank sentences with a fraction of the bytes
+        centered = embedding_matrix - embedding_matrix.mean(axis=0)
+        _, eigenvectors = np.linalg.eigh(centered.T @ centered)
+        components = np.ascontiguousarray(eigenvectors[:, ::-1][:, :_PCA_COMPONENTS].T, dtype=np.float32)
+        reduced = centered @ components.T
+
+        sq8_min = reduced.min(axis=0)
+        span = reduced.max(axis=0) - sq8_min
+        sq8_scale = np.where(span > 0, span / 255.0, 1.0).astype(np.float32)
+        codes = np.rint((reduced - sq8_min) / sq8_scale) - 128
+        codes = np.clip(codes, -128, 127).astype(np.int8)
+
+        codes.tofile(self._sidecar_path(_SQ8_CODES_FILE))
+        np.savez(
+            self._sidecar_path(_SQ8_PARAMS_FILE),
+            min=sq8_min, scale=sq8_scale, components=components, shape=np.array(codes.shape)
+        )
+
+    def _write_hnsw_index(self, embedding_matrix: np.ndarray):
+        """
+        Build and save an hnswlib graph over the embeddings of corpora too large for an exact scan.
+        """
+        path = self._sidecar_path(_HNSW_INDEX_FILE)
+        if os.path.exists(path):
+            os.remove(path)
+        if hnswlib is None or len(embedding_matrix) <= _EXACT_SCAN_LIMIT:
+            return
+
+        # Unit-length vectors: inner-product space ranks by cosine similarity
+        index = hnswlib.Index(space='ip', dim=embedding_matrix.shape[1])
+        index.init_index(max_elements=len(embedding_matrix), ef_construction=_HNSW_EF_CONSTRUCTION, M=_HNSW_M)
+        index.add_items(embedding_matrix, np.arange(len(embedding_matrix)))
+        index.save_index(path)
+
+    def _load_hnsw_index(self) -> bool:
+        """
+        Load the hnswlib graph written by _write_hnsw_index, if there is one.
+        """
+        self.ann_index = None
+        path = self._sidecar_path(_HNSW_INDEX_FILE)
+        if hnswlib is None or not os.path.exists(path):
+            return False
+
+        try:
+            index = hnswlib.Index(space='ip', dim=self.embeddings.shape[1])
+            index.load_index(path, max_elements=len(self.embeddings))
+            if index.get_current_count() != len(self.embeddings):
+                return False
+            index.set_ef(_HNSW_EF_SEARCH)
+            self.ann_index = index
+            return True
+        except Exception as e:
+            print(f"HNSW index unavailable, using the quantized indexes: {e}")
+            return False
+
+    def _load_sq8_index(self) -> bool:
+        """
+        Memory-map the int8 index written by _write_sq8_index.
+        """
+        self.embeddings_sq8 = None
+        try:
+            with np.load(self._sidecar_path(_SQ8_PARAMS_FILE)) as params:
+                self.sq8_min = params['min']
+                self.sq8_scale = params['scale']
+                self.pca_components = params['components']
+                shape = tuple(int(n) for n in params['shape'])
+            self.embeddings_sq8 = np.memmap(self._sidecar_path(_SQ8_CODES_FILE), dtype=np.int8, mode='r', shape=shape)
+            return True
+        except Exception as e:
+            print(f"Int8 index unavailable, searching through ChromaDB: {e}")
+            return False
+
+    def _write_binary_index(self, embedding_matrix: np.ndarray):
+        """
+        Save the sign bits of the mean-centred embeddings, packed eight dimensions per byte.
+        """
+        # q . x and q . (x - mean) rank sentences identically, and centring
+        # spreads the bits far better than the raw signs of anisotropic embeddings
+        center = embedding_matrix.mean(axis=0)
+        np.packbits(embedding_matrix > center, axis=1).tofile(self._sidecar_path(_BINARY_CODES_FILE))
+
+    def _load_binary_index(self) -> bool:
+        """
+        Memory-map the packed sign bits written by _write_binary_index.
+        """
+        self.embeddings_binary = None
+        try:
+            rows = len(self.embeddings_sq8)
+            dims = self.pca_components.shape[1]
+            self.embeddings_binary = np.memmap(
+                self._sidecar_path(_BINARY_CODES_FILE), dtype=np.uint8, mode='r', shape=(rows, (dims + 7) // 8)
+            )
+            return True
+        except Exception as e:
+            print(f"Binary index unavailable, scanning the full int8 index: {e}")
+            return False
+
+    def _binary_candidates(self, query_embedding: np.ndarray, count: int) -> np.ndarray:
+        """
+        Return the indices of the `count` sentences whose sign bits are closest in Hamming distance.
+        """
+        query_bits = np.packbits(query_embedding > 0)
+        differing = np.bitwise_xor(self.embeddings_binary, query_bits)
+        if hasattr(np, 'bitwise_count'):
+            hamming = np.bitwise_count(differing).sum(axis=1, dtype=np.int32)
+        else:
+            hamming = np.unpackbits(differing, axis=1).sum(axis=1, dtype=np.int32)
+        return np.argpartition(hamming, count - 1)[:count]
+
+    def _sq8_candidates(self, query_embedding: np.ndarray, count: int, rows: np.ndarray = None) -> np.ndarray:
+        """
+        Return the indices of the `count` best sentences by approximate int8 dot product,
+        optionally scoring only the given rows.
+        """
+        # P (x - mean) ~ min + scale * (code + 128), so q . x ranks like (P q * scale) . code
+        weights = (self.pca_components @ query_embedding) * self.sq8_scale
+        peak = np.abs(weights).max()
+        query_sq8 = np.rint(weights / peak * 127).astype(np.int8) if peak > 0 else np.zeros_like(weights, np.int8)
+
+        if rows is None:
+            codes = self.embeddings_sq8
+            rows = np.arange(len(codes))
+        else:
+            rows = np.sort(rows)  # ascending reads from the memory map
+            codes = self.embeddings_sq8[rows]
+
+        approx = np.einsum('ij,j->i', codes, query_sq8, dtype=np.int32)
+        if count >= len(approx):
+            return rows
+        return rows[np.argpartition(-approx, count - 1)[:count]]
+
+    def _build_search_text(self):
+        """
+        Join the sentences (and their lowercase forms) into single strings for regular search,
+        recording where each sentence starts.
+        """
+        lowered = [sentence.lower() for sentence in self.sentences]
+        self._search_text = _SENTENCE_SEPARATOR.join(self.sentences)
+        self._search_text_lower = _SENTENCE_SEPARATOR.join(lowered)
+
+        # Lowercasing can change a sentence's length, so each text has its own offsets
+        self._sentence_offsets = [
+            list(itertools.accumulate((len(text) + 1 for text in texts[:-1]), initial=0))
+            for texts in (self.sentences, lowered)
+        ]
+        self._last_regular = None
+
     def regular_search(self, query: str, case_sensitive: bool = False) -> List[Tuple[str, int]]:
         """
         Perform regular text search.
@@ -193,12 +698,42 @@ class VectorTextSearcher:
         if not case_sensitive:
             query = query.lower()
 
-        for i, sentence in enumerate(self.sentences):
-            search_text = sentence if case_sensitive else sentence.lower()
-            if query in search_text:
-                results.append((sentence, i))
-
-        return results
+        if _SENTENCE_SEPARATOR in query:
+            # Could match across the separator; check each sentence on its own
+            for i, sentence in enumerate(self.sentences):
+                search_text = sentence if case_sensitive else sentence.lower()
+                if query in search_text:
+                    results.append((sentence, i))
+            return results
+
+        search_text = self._search_text if case_sensitive else self._search_text_lower
+        offsets = self._sentence_offsets[0 if case_sensitive else 1]
+
+        # Typing "mach" then "machine": every sentence containing the new query also
+        # contained the previous one, so only the previous hits need checking
+        previous = self._last_regular
+        if previous is not None and previous[1] == case_sensitive and previous[0] in query:
+            for sentence, i in previous[2]:
+                end = offsets[i + 1] - 1 if i + 1 < len(offsets) else len(search_text)
+                if search_text.find(query, offsets[i], end) >= 0:
+                    results.append((sentence, i))
+            self._last_regular = (query, case_sensitive, results)
+            return list(results)
+
+        # One str.find scan of the joined text per match instead of a Python-level test per sentence
+        start = 0
+        while True:
+            found = search_text.find(query, start)
+            if found < 0:
+                break
+            i = bisect.bisect_right(offsets, found) - 1
+            results.append((self.sentences[i], i))
+            if i + 1 >= len(self.sentences):
+                break
+            start = offsets[i + 1]  # next sentence, so each is reported once
+
+        self._last_regular = (query, case_sensitive, results)
+        return list(results)
 
     def semantic_search(self, query: str, top_k: int = 5) -> List[Tuple[str, int, float]]:
         """
@@ -210,22 +745,30 @@ class VectorTextSearcher:
         try:
             top_k = min(top_k, 50)
 
+            query_embedding = self._embed_query(query)
+
+            if self.embeddings is not None:
+                return self._local_search(query_embedding, top_k)
+            if self.embeddings_sq8 is not None:
+                return self._sq8_search(query_embedding, top_k)
+
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[query_embedding.tolist()],
                 n_results=top_k,
                 include=["documents", "metadatas", "distances"]
             )
 
-            search_results = []
-            if results['documents'] and results['documents'][0]:
-                for doc, metadata, distance in zip(
-                        results['documents'][0],
-                        results['metadatas'][0],
-                        results['distances'][0]
-                ):
-                    similarity = 1 - distance
-                    position = metadata['position']
-                    search_results.append((doc, position, similarity))
+            if not results['documents'] or not results['documents'][0]:
+                return []
+
+            documents = results['documents'][0]
+            metadatas = results['metadatas'][0]
+            similarities = 1.0 - np.asarray(results['distances'][0], dtype=np.float32)
+            positions = np.fromiter(
+                ((metadata or {}).get('position', -1) for metadata in metadatas),
+                dtype=np.int64, count=len(metadatas)
+            )
+            search_results = list(zip(documents, positions.tolist(), similarities.tolist()))
 
             return search_results
 
@@ -233,6 +776,128 @@ class VectorTextSearcher:
             print(f"Error during semantic search: {e}")
             return []
 
+    def _embed_query(self, query: str) -> np.ndarray:
+        """
+        Return the unit-length float32 embedding of a query, reusing cached ones.
+        """
+        # The model is uncased, so case and surrounding whitespace do not change the vector
+        key = query.strip().lower()
+        query_embedding = self._query_cache.get(key)
+        if query_embedding is not None:
+            self._query_cache.move_to_end(key)
+            return query_embedding
+
+        query_embedding = self.model.encode([key], normalize_embeddings=True, convert_to_numpy=True)[0]
+        query_embedding = query_embedding.astype(np.float32)
+        query_embedding.setflags(write=False)
+
+        self._query_cache[key] = query_embedding
+        if len(self._query_cache) > _QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return query_embedding
+
+    def _load_query_cache(self):
+        """
+        Restore the query embeddings saved by save_query_cache, oldest first.
+        """
+        path = self._sidecar_path(_QUERY_CACHE_FILE)
+        if not os.path.exists(path):
+            return
+
+        try:
+            with np.load(path) as saved:
+                for key, query_embedding in zip(saved['queries'].tolist(), saved['embeddings']):
+                    query_embedding.setflags(write=False)
+                    self._query_cache[key] = query_embedding
+            while len(self._query_cache) > _QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        except Exception as e:
+            print(f"Error loading query cache: {e}")
+
+    def save_query_cache(self):
+        """
+        Write the cached query embeddings to the persist directory for the next session.
+        """
+        if not self._query_cache:
+            return
+
+        try:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            np.savez(
+                self._sidecar_path(_QUERY_CACHE_FILE),
+                queries=np.array(list(self._query_cache.keys())),
+                embeddings=np.stack(list(self._query_cache.values()))
+            )
+        except Exception as e:
+            print(f"Error saving query cache: {e}")
+
+    def _index_candidates(self, query_embedding: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        Pick the sentences worth rescoring exactly, using the binary and int8 indexes.
+        """
+        # Hamming distance on the sign bits cheaply narrows the corpus to an eighth;
+        # the int8 scan of that shortlist then picks the candidates to rescore exactly
+        shortlist = None
+        shortlist_size = max(64 * top_k, len(self.embeddings_sq8) // 8)
+        if self.embeddings_binary is not None and len(self.embeddings_binary) > shortlist_size:
+            shortlist = self._binary_candidates(query_embedding, shortlist_size)
+
+        # The PCA codes only rank candidates; a wider rescoring pool covers what the
+        # discarded components lose, and the reported scores are always exact
+        return self._sq8_candidates(query_embedding, max(128, 16 * top_k), shortlist)
+
+    def _local_search(self, query_embedding: np.ndarray, top_k: int) -> List[Tuple[str, int, float]]:
+        """
+        Score the memory-mapped float32 embeddings directly, without going through ChromaDB.
+        """
+        if self.ann_index is not None and len(self.embeddings) > _EXACT_SCAN_LIMIT:
+            # The graph returns approximate neighbours; score them exactly from the map
+            self.ann_index.set_ef(max(_HNSW_EF_SEARCH, top_k))
+            labels, _ = self.ann_index.knn_query(query_embedding, k=min(top_k, len(self.embeddings)))
+            candidates = np.sort(labels[0].astype(np.int64))
+            similarities = self.embeddings[candidates] @ query_embedding
+        elif self.embeddings_sq8 is not None and len(self.embeddings) > _EXACT_SCAN_LIMIT:
+            candidates = np.sort(self._index_candidates(query_embedding, top_k))
+            similarities = self.embeddings[candidates] @ query_embedding
+        else:
+            candidates = np.arange(len(self.embeddings))
+            if _dot_scores is not None:
+                similarities = _dot_scores(self.embeddings, query_embedding)
+            else:
+                similarities = self.embeddings @ query_embedding
+
+        if top_k < len(similarities):
+            best = np.argpartition(-similarities, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(similarities))
+        best = best[np.argsort(-similarities[best])]
+
+        return [
+            (self.sentences[i], int(i), float(similarity))
+            for i, similarity in zip(candidates[best].tolist(), similarities[best].tolist())
+        ]
+
+    def _sq8_search(self, query_embedding: np.ndarray, top_k: int) -> List[Tuple[str, int, float]]:
+        """
+        Scan the int8 index, then rescore the candidates with their float32 vectors from ChromaDB.
+        """
+        candidates = self._index_candidates(query_embedding, top_k)
+        results = self.collection.get(
+            ids=[f"doc_{i}" for i in candidates],
+            include=["documents", "metadatas", "embeddings"]
+        )
+        if not results['ids']:
+            return []
+
+        # Stored vectors are unit length, so the dot product is the cosine similarity
+        similarities = np.asarray(results['embeddings'], dtype=np.float32) @ query_embedding
+        order = np.argsort(-similarities)[:top_k]
+
+        return [
+            (results['documents'][i], results['metadatas'][i]['position'], float(similarities[i]))
+            for i in order
+        ]
+
     def get_database_info(self) -> Dict:
         """
         Get information about the vector database.
@@ -254,9 +919,12 @@ class VectorTextSearcher:
 class ResultsListCtrl(wx.ListCtrl, listmix.ListCtrlAutoWidthMixin):
     def __init__(self, parent, id=wx.ID_ANY, pos=wx.DefaultPosition,
                  size=wx.DefaultSize, style=wx.LC_REPORT):
-        wx.ListCtrl.__init__(self, parent, id, pos, size, style)
+        # Virtual list: rows are drawn on demand from self.rows via OnGetItemText
+        wx.ListCtrl.__init__(self, parent, id, pos, size, style | wx.LC_VIRTUAL)
         listmix.ListCtrlAutoWidthMixin.__init__(self)
 
+        self.rows = []
+        self.search_type = "semantic"
         self.setup_columns()
 
     def setup_columns(self):
@@ -268,20 +936,21 @@ class ResultsListCtrl(wx.ListCtrl, listmix.ListCtrlAutoWidthMixin):
 
     def update_results(self, results, search_type="semantic"):
         """Update the list with search results"""
-        self.DeleteAllItems()
-
-        for i, result in enumerate(results, 1):
-            if search_type == "regular":
-                sentence, position = result
-                score = "N/A"
-            else:
-                sentence, position, score = result
-                score = f"{score:.3f}"
-
-            index = self.InsertItem(self.GetItemCount(), str(i))
-            self.SetItem(index, 1, str(position))
-            self.SetItem(index, 2, score)
-            self.SetItem(index, 3, sentence)
+        self.rows = results
+        self.search_type = search_type
+        self.SetItemCount(len(results))
+        self.Refresh()
+
+    def OnGetItemText(self, item, col):
+        """Text of one cell, requested by the virtual list when the row is drawn"""
+        result = self.rows[item]
+        if col == 0:
+            return str(item + 1)
+        if col == 1:
+            return str(result[1])
+        if col == 2:
+            return "N/A" if self.search_type == "regular" else f"{result[2]:.3f}"
+        return result[0]
 
 
 class TextSearchFrame(wx.Frame):
@@ -291,7 +960,14 @@ class TextSearchFrame(wx.Frame):
         self.searcher = VectorTextSearcher()
         self.current_file = ""
 
+        # Searches run on a worker thread; the queue holds only the newest pending request
+        self._search_queue = queue.Queue(maxsize=1)
+        # Bumped whenever another file is loaded; results tagged with an older value are dropped
+        self._index_generation = 0
+        threading.Thread(target=self._search_worker, daemon=True).start()
+
         self.init_ui()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
         self.Centre()
         self.Show()
 
@@ -407,6 +1083,11 @@ class TextSearchFrame(wx.Frame):
         self.progress_label.SetLabel("Initializing...")
         self.search_text.Disable()
 
+        # Searches queued or still running for the previous file are no longer wanted
+        self._index_generation += 1
+        with contextlib.suppress(queue.Empty):
+            self._search_queue.get_nowait()
+
         # Start processing in background thread
         self.searcher.set_file_path(filepath)
         thread = threading.Thread(target=self.process_file)
@@ -456,17 +1137,47 @@ class TextSearchFrame(wx.Frame):
             wx.MessageBox("Please enter a search query.", "Empty Query", wx.OK | wx.ICON_WARNING)
             return
 
-        # Perform search
+        # Hand the search to the worker, replacing any request it has not started yet
         search_type = self.search_type.GetSelection()  # 0 = semantic, 1 = regular
-        top_k = self.num_results.GetValue()
+        request = (self._index_generation, search_type, query,
+                   self.num_results.GetValue(), self.case_sensitive.GetValue())
 
-        if search_type == 0:  # Semantic search
-            results = self.searcher.semantic_search(query, top_k)
-            search_type_str = "semantic"
-        else:  # Regular search
-            case_sensitive = self.case_sensitive.GetValue()
-            results = self.searcher.regular_search(query, case_sensitive)
-            search_type_str = "regular"
+        with contextlib.suppress(queue.Empty):
+            self._search_queue.get_nowait()
+        with contextlib.suppress(queue.Full):
+            self._search_queue.put_nowait(request)
+        self.status_bar.SetStatusText(f"Searching for: '{query}'...")
+
+    def _search_worker(self):
+        """Run queued searches in the background so the UI stays responsive"""
+        while True:
+            generation, search_type, query, top_k, case_sensitive = self._search_queue.get()
+
+            try:
+                if search_type == 0:  # Semantic search
+                    results = self.searcher.semantic_search(query, top_k)
+                    search_type_str = "semantic"
+                else:  # Regular search
+                    results = self.searcher.regular_search(query, case_sensitive)
+                    search_type_str = "regular"
+            except Exception as e:
+                print(f"Error during search: {e}")
+                continue
+
+            wx.CallAfter(self.show_results, results, search_type_str, query, generation)
+
+    def show_results(self, results, search_type_str, query, generation):
+        """Display the results of a finished search"""
+        if not self:  # frame closed while the search was running
+            return
+
+        # Searched the file that was loaded before the current one
+        if generation != self._index_generation:
+            return
+
+        # A newer request is already waiting; skip drawing this one
+        if not self._search_queue.empty():
+            return
 
         # Update results
         self.results_list.update_results(results, search_type_str)
@@ -479,6 +1190,11 @@ class TextSearchFrame(wx.Frame):
         self.case_sensitive.Show(search_type == 1)  # Show only for regular search
         self.GetSizer().Layout()
 
+    def on_close(self, event):
+        """Keep the query embeddings for the next session"""
+        self.searcher.save_query_cache()
+        event.Skip()
+
     def on_refresh_info(self, event):
         """Refresh database information"""
         self.update_database_info()
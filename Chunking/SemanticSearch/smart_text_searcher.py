@@ -1,9 +1,123 @@
 import re
 import os
+import mmap
+import bisect
+import hashlib
+import itertools
+import threading
+import multiprocessing
+import contextlib
+import functools
+import numpy as np
+import torch
 import chromadb
 from sentence_transformers import SentenceTransformer
 from typing import List, Tuple, Dict
 
+try:
+    import intel_extension_for_pytorch as ipex
+except ImportError:
+    ipex = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Joins the sentences into one searchable text; a query containing it falls back to per-sentence checks
+_SENTENCE_SEPARATOR = "\x00"
+
+# Sentence boundaries: runs of terminal punctuation, matched in the raw UTF-8 bytes
+_SENT_SPLIT_RE_BYTES = re.compile(rb'[.!?]+')
+
+if hyperscan is not None:
+    # Hyperscan's SIMD DFA reports every single terminal byte; runs of them
+    # just produce empty pieces, which are dropped like the regex's runs
+    _SENT_SPLIT_HS = hyperscan.Database()
+    _SENT_SPLIT_HS.compile(expressions=[rb'[.!?]'], ids=[0], elements=1, flags=[0])
+else:
+    _SENT_SPLIT_HS = None
+
+# Corpora up to this size are searched with one NumPy matrix-vector product
+# over an (N, D) float32 matrix, memory-mapped from a file next to the database
+_EXACT_SCAN_LIMIT = 50_000
+_EMBEDDINGS_FILE = "embeddings_f32.npy"
+
+# Content hash of every embedded sentence, so a reindex only encodes new or edited ones
+_EMBEDDINGS_HASHES_FILE = "embeddings_hashes.npz"
+_HASH_NORMALIZE_RE = re.compile(r'[\W_]+')
+
+# In-process FAISS index kept next to the Chroma database
+_FAISS_INDEX_FILE = "faiss_fp16_ip.index"
+_FAISS_MAX_SENTENCES = 1_000_000  # a flat index holds every vector in RAM
+
+# Large corpora are first searched in a 128-dimensional projection, then the
+# shortlist is rescored with the full vectors
+_COARSE_INDEX_FILE = "faiss_coarse_ip.index"
+_COARSE_COMPONENTS_FILE = "faiss_coarse_components.npy"
+_COARSE_DIM = 128
+_COARSE_MIN_SENTENCES = 100_000
+_COARSE_TRAIN_SAMPLE = 100_000
+
+# Rows per collection.add call, well under Chroma's maximum batch size
+_DB_BATCH_SIZE = 166
+
+# Near-duplicate queries (cosine at or above the threshold) share cached results
+_FUZZY_CACHE_THRESHOLD = 0.95
+_FUZZY_CACHE_SIZE = 128
+
+# Cold index builds this large are encoded by one worker process per CPU core
+_PARALLEL_ENCODE_MIN_SENTENCES = 20_000
+_SHARDS_PER_WORKER = 4  # smaller shards keep the workers evenly loaded
+
+# Sentence model of an encoding worker process, loaded once by _init_encode_worker
+_worker_model = None
+
+
+def _sentence_hashes(sentences: List[str], normalize: bool = False) -> np.ndarray:
+    """
+    128-bit BLAKE2b digest of every sentence. With normalize, runs of whitespace and
+    punctuation are collapsed first, so edits that only touch those still match.
+    """
+    if normalize:
+        sentences = [_HASH_NORMALIZE_RE.sub(' ', sentence).strip() for sentence in sentences]
+    digests = (hashlib.blake2b(sentence.encode('utf-8'), digest_size=16).digest() for sentence in sentences)
+    return np.fromiter(digests, dtype='S16', count=len(sentences))
+
+
+def _init_encode_worker():
+    """
+    Pool initializer: load and INT8-quantize the sentence model once per worker.
+    Each worker runs single-threaded, so the processes split the cores between them.
+    """
+    global _worker_model
+    torch.set_num_threads(1)
+    _worker_model = SentenceTransformer(_MODEL_NAME, device='cpu')
+    torch.ao.quantization.quantize_dynamic(
+        _worker_model[0].auto_model.eval(), {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+def _encode_shard(shard: List[str]) -> np.ndarray:
+    """
+    Encode one shard of sentences in a worker process.
+    """
+    with torch.inference_mode():
+        return _worker_model.encode(
+            shard,
+            batch_size=128,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            normalize_embeddings=True
+        ).astype(np.float16)
+
 
 class VectorTextSearcher:
     def __init__(self, file_path: str, persist_directory: str = "./chroma_db"):
@@ -17,11 +131,29 @@ class VectorTextSearcher:
         self.file_path = file_path
         self.persist_directory = persist_directory
         self.sentences = []
+        self._search_text = ""
+        self._search_text_lower = ""
+        self._sentence_offsets = None
         self.model = None
+        self.use_bf16 = False
+        self.use_int8 = False
         self.client = None
         self.collection = None
+        self.embeddings = None
+        self.index = None
+        self.coarse_index = None
+        self.coarse_components = None
         self.is_initialized = False
 
+        # Set once semantic search can run; the index may be built on a worker thread
+        self._index_ready = threading.Event()
+        self._index_failed = False
+
+        # Repeated queries skip the encoder, and repeated searches skip the index too
+        self._embed_query = functools.lru_cache(maxsize=256)(self._encode_query)
+        self._search_cached = functools.lru_cache(maxsize=256)(self._search)
+        self._clear_fuzzy_cache()
+
     def _load_and_split_text(self) -> List[str]:
         """
         Load the text file and split it into sentences.
@@ -30,13 +162,18 @@ class VectorTextSearcher:
             List[str]: List of sentences from the text file
         """
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
-
-            # Split text into sentences (improved approach)
-            sentences = re.split(r'[.!?]+', text)
-            # Remove empty strings and strip whitespace
-            sentences = [s.strip() for s in sentences if s.strip()]
+            with open(self.file_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return []
+
+                # Split the memory-mapped bytes and decode one sentence at a time,
+                # so the whole file never exists as a Python str
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as text:
+                    pieces = self._iter_sentence_bytes(text)
+                    try:
+                        sentences = [s for s in map(self._decode_sentence, pieces) if s]
+                    finally:
+                        pieces.close()  # release the regex's hold on the map before it closes
             return sentences
 
         except FileNotFoundError:
@@ -46,9 +183,40 @@ class VectorTextSearcher:
             print(f"Error loading file: {e}")
             return []
 
+    @staticmethod
+    def _iter_sentence_bytes(text):
+        """
+        Yield the byte slices between sentence boundaries. '.', '!' and '?' are
+        ASCII, so a boundary is never inside a multi-byte UTF-8 character.
+        """
+        start = 0
+        if _SENT_SPLIT_HS is not None:
+            ends = []
+            _SENT_SPLIT_HS.scan(text, match_event_handler=lambda _id, _from, end, _flags, _context: ends.append(end))
+            for end in ends:
+                if end - 1 > start:
+                    yield text[start:end - 1]
+                start = end
+        else:
+            for match in _SENT_SPLIT_RE_BYTES.finditer(text):
+                yield text[start:match.start()]
+                start = match.end()
+        yield text[start:]
+
+    @staticmethod
+    def _decode_sentence(raw: bytes) -> str:
+        """
+        Decode one sentence with text-mode newline handling and strip its whitespace.
+        """
+        if b'\r' in raw:
+            raw = raw.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        return raw.decode('utf-8').strip()
+
     def _needs_reindexing(self) -> bool:
         """
         Check if we need to reindex the database (file modified or first run).
+        The collection records the file's mtime and content hash; a changed mtime
+        only forces a reindex when the content hash differs too.
 
         Returns:
             bool: True if reindexing is needed
@@ -61,17 +229,65 @@ class VectorTextSearcher:
         try:
             client = chromadb.PersistentClient(path=self.persist_directory)
             collection = client.get_collection("text_embeddings")
-            if collection.count() == 0:
+            count = collection.count()
+            if count == 0 or count != len(self.sentences):
+                return True
+
+            # Rows are unit length, so Chroma must rank by inner product (1 - distance is then cosine)
+            if self._collection_space(collection) != "ip":
+                return True
+
+            metadata = collection.metadata or {}
+            if metadata.get("source_file") != self.file_path or "file_hash" not in metadata:
+                return True
+            if metadata.get("file_mtime_ns") == os.stat(self.file_path).st_mtime_ns:
+                return False
+
+            # Touched but maybe not edited: compare the contents
+            signature = self._file_signature()
+            if signature["file_hash"] != metadata["file_hash"]:
                 return True
+            # Chroma refuses hnsw:* keys in modify(); the space stays in the collection configuration
+            collection.modify(metadata={
+                key: value for key, value in {**metadata, **signature}.items() if not key.startswith("hnsw:")
+            })
         except:
             return True
 
         return False
 
-    def initialize(self):
+    @staticmethod
+    def _collection_space(collection) -> str:
+        """
+        Distance function of a collection: its "hnsw:space" metadata, or the
+        collection configuration once modify() has replaced the metadata.
+        """
+        space = (collection.metadata or {}).get("hnsw:space")
+        if space is None:
+            configuration = getattr(collection, "configuration_json", None) or {}
+            space = (configuration.get("hnsw") or {}).get("space", "l2")
+        return space
+
+    def _file_signature(self) -> Dict:
+        """
+        Modification time (ns) and BLAKE2b digest of the text file, stored in the
+        collection metadata to detect a changed file on the next start.
+        """
+        mtime_ns = os.stat(self.file_path).st_mtime_ns
+        digest = hashlib.blake2b()
+        with open(self.file_path, 'rb') as file:
+            for block in iter(functools.partial(file.read, 1 << 20), b''):
+                digest.update(block)
+        return {"source_file": self.file_path, "file_mtime_ns": mtime_ns, "file_hash": digest.hexdigest()}
+
+    def initialize(self, background: bool = False):
         """
         Initialize the system - load text and setup vector database.
         Only computes embeddings on first run or if file changes.
+
+        Args:
+            background (bool): Compute needed embeddings on a worker thread, so
+                regular search works at once and semantic search waits for the index
         """
         print("Initializing text search system...")
 
@@ -82,10 +298,16 @@ class VectorTextSearcher:
             return False
 
         print(f"Loaded {len(self.sentences)} sentences from: {self.file_path}")
+        self._build_search_text()
 
         # Initialize model
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = self._load_model()
+            if self.model.device.type == 'cpu' and self.model.backend == 'torch':
+                if ipex is not None:
+                    self._optimize_for_bf16()
+                else:
+                    self._quantize_int8()
         except Exception as e:
             print(f"Error loading model: {e}")
             return False
@@ -95,32 +317,119 @@ class VectorTextSearcher:
             self.client = chromadb.PersistentClient(path=self.persist_directory)
             self.collection = self.client.get_or_create_collection(
                 name="text_embeddings",
-                metadata={"description": "Text embeddings for semantic search"}
+                metadata={"description": "Text embeddings for semantic search", "hnsw:space": "ip"}
             )
         except Exception as e:
             print(f"Error initializing ChromaDB: {e}")
             return False
 
         # Check if we need to compute embeddings
+        self._index_ready.clear()
         if self._needs_reindexing():
-            print("Computing and storing embeddings (this may take a moment)...")
-            success = self._store_embeddings()
-            if success:
-                print("✓ Embeddings computed and stored successfully!")
+            if background:
+                print("Computing and storing embeddings in the background; regular search is available now...")
+                threading.Thread(target=self._build_index, kwargs={"show_progress": False}, daemon=True).start()
             else:
-                print("✗ Failed to store embeddings")
-                return False
+                print("Computing and storing embeddings (this may take a moment)...")
+                if not self._build_index():
+                    return False
         else:
             print("✓ Using existing embeddings from vector database")
+            if len(self.sentences) <= _EXACT_SCAN_LIMIT:
+                if not self._load_embeddings_file():
+                    self._load_embeddings_from_collection()
+            else:
+                self._load_faiss_index()
+            self._finish_index(True)
 
         self.is_initialized = True
         print("System ready for searches!")
         return True
 
-    def _store_embeddings(self) -> bool:
+    def _build_index(self, show_progress: bool = True) -> bool:
+        """
+        Compute and store the embeddings, then open semantic search.
+
+        Returns:
+            bool: True if successful
+        """
+        success = self._store_embeddings(show_progress)
+        if success:
+            print("✓ Embeddings computed and stored successfully!")
+        else:
+            print("✗ Failed to store embeddings")
+        self._finish_index(success)
+        return success
+
+    def _finish_index(self, success: bool):
+        """
+        Mark the semantic index as ready (or failed) and drop results cached from a previous index.
+        """
+        self._search_cached.cache_clear()
+        self._clear_fuzzy_cache()
+        self._index_failed = not success
+        self._index_ready.set()
+
+    def _load_model(self) -> SentenceTransformer:
+        """
+        Load the sentence model: on the GPU when there is one, otherwise the INT8
+        ONNX export through ONNX Runtime (all graph optimizations on), falling
+        back to PyTorch when onnxruntime/optimum are not installed.
+        """
+        if torch.cuda.is_available():
+            return SentenceTransformer(_MODEL_NAME, device='cuda')
+
+        try:
+            return SentenceTransformer(
+                _MODEL_NAME,
+                device='cpu',
+                backend='onnx',
+                model_kwargs={
+                    "provider": "CPUExecutionProvider",
+                    "file_name": "onnx/model_qint8_avx512_vnni.onnx"
+                }
+            )
+        except Exception as e:
+            print(f"ONNX Runtime unavailable, using PyTorch: {e}")
+            return SentenceTransformer(_MODEL_NAME, device='cpu')
+
+    def _optimize_for_bf16(self):
+        """
+        Let Intel Extension for PyTorch repack the transformer weights for BF16
+        on CPU (AMX/AVX-512 BF16 units), halving the weight bytes read per token.
+        """
+        ipex.optimize(self.model[0].auto_model.eval(), dtype=torch.bfloat16, inplace=True)
+        self.use_bf16 = True
+        print("Using BF16 inference (Intel Extension for PyTorch)")
+
+    def _quantize_int8(self):
+        """
+        Swap the transformer's Linear layers for dynamically quantized INT8 ones
+        (weights stored as int8, activations quantized per batch), which run on
+        the CPU's int8 dot-product instructions.
+        """
+        torch.ao.quantization.quantize_dynamic(
+            self.model[0].auto_model.eval(), {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+        self.use_int8 = True
+
+    def _inference_context(self):
+        """
+        Context for running the encoder: no autograd, and BF16 autocast when enabled.
+        """
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self.use_bf16:
+            stack.enter_context(torch.autocast('cpu', dtype=torch.bfloat16))
+        return stack
+
+    def _store_embeddings(self, show_progress: bool = True) -> bool:
         """
         Compute embeddings and store them in ChromaDB.
 
+        Args:
+            show_progress (bool): Show the encoding progress bar
+
         Returns:
             bool: True if successful
         """
@@ -133,43 +442,50 @@ class VectorTextSearcher:
 
             self.collection = self.client.get_or_create_collection(
                 name="text_embeddings",
-                metadata={"description": "Text embeddings for semantic search"}
+                metadata={"description": "Text embeddings for semantic search", "hnsw:space": "ip",
+                          **self._file_signature()}
             )
 
-            # Compute embeddings in batches to handle large files
-            batch_size = 32
-            all_embeddings = []
-
-            for i in range(0, len(self.sentences), batch_size):
-                batch = self.sentences[i:i + batch_size]
-                batch_embeddings = self.model.encode(batch).tolist()
-                all_embeddings.extend(batch_embeddings)
-
-                # Show progress
-                progress = min(i + batch_size, len(self.sentences))
-                print(f"  Processing: {progress}/{len(self.sentences)} sentences")
-
-            # Prepare and store all documents
-            documents = []
-            metadatas = []
-            ids = []
-
-            for i, (sentence, embedding) in enumerate(zip(self.sentences, all_embeddings)):
-                documents.append(sentence)
-                metadatas.append({
-                    "position": i,
-                    "length": len(sentence),
-                    "source_file": self.file_path
-                })
-                ids.append(f"doc_{i}")
-
-            # Add to collection
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids,
-                embeddings=all_embeddings
-            )
+            # Sentences the previous build already embedded are copied over by
+            # content hash, so only new or edited ones go through the model
+            hashes = _sentence_hashes(self.sentences)
+            normalized_hashes = _sentence_hashes(self.sentences, normalize=True)
+            all_embeddings, missing_rows = self._reuse_previous_embeddings(hashes, normalized_hashes)
+            hashes_path = self._sidecar_path(_EMBEDDINGS_HASHES_FILE)
+            if os.path.exists(hashes_path):
+                os.remove(hashes_path)  # rewritten once the new vectors are saved
+            if all_embeddings is None:
+                all_embeddings = self._encode_corpus(self.sentences, show_progress)
+            else:
+                print(f"Reusing {len(self.sentences) - len(missing_rows)} stored embeddings; "
+                      f"encoding {len(missing_rows)} new sentences")
+                if missing_rows:
+                    all_embeddings[missing_rows] = self._encode_corpus(
+                        [self.sentences[i] for i in missing_rows], show_progress
+                    )
+
+            # Small corpora are scanned in memory; larger ones go to FAISS
+            self._save_embeddings(all_embeddings)
+            self._build_faiss_index(all_embeddings)
+            np.savez(hashes_path, hashes=hashes, normalized_hashes=normalized_hashes, model=_MODEL_NAME)
+
+            # Prepare all documents once
+            ids = [f"doc_{i}" for i in range(len(self.sentences))]
+            metadatas = [
+                {"position": i, "length": len(sentence), "source_file": self.file_path}
+                for i, sentence in enumerate(self.sentences)
+            ]
+
+            # Add to collection in fixed-size slices; Chroma takes float32, so
+            # each slice is widened only as it is handed over
+            for start in range(0, len(self.sentences), _DB_BATCH_SIZE):
+                end = start + _DB_BATCH_SIZE
+                self.collection.add(
+                    documents=self.sentences[start:end],
+                    metadatas=metadatas[start:end],
+                    ids=ids[start:end],
+                    embeddings=all_embeddings[start:end].astype(np.float32)
+                )
 
             return True
 
@@ -177,6 +493,257 @@ class VectorTextSearcher:
             print(f"Error storing embeddings: {e}")
             return False
 
+    def _faiss_index_path(self) -> str:
+        """Path of the FAISS index file inside the persist directory"""
+        return self._sidecar_path(_FAISS_INDEX_FILE)
+
+    def _reuse_previous_embeddings(self, hashes: np.ndarray,
+                                   normalized_hashes: np.ndarray) -> Tuple[np.ndarray, List[int]]:
+        """
+        Copy the stored embeddings of sentences whose hash appears in the previous
+        build, from the embeddings file or, for large corpora, the FAISS index.
+        Exact text matches come first; only sentences without one fall back to
+        the whitespace/punctuation-normalized hash.
+
+        Returns:
+            Tuple[np.ndarray, List[int]]: FP16 embedding matrix (None if nothing
+            was reusable) and the rows still to be encoded
+        """
+        try:
+            with np.load(self._sidecar_path(_EMBEDDINGS_HASHES_FILE)) as stored:
+                if str(stored['model']) != _MODEL_NAME:
+                    return None, []
+                previous_hashes = stored['hashes']
+                previous_normalized = stored['normalized_hashes']
+
+            embeddings_path = self._sidecar_path(_EMBEDDINGS_FILE)
+            if os.path.exists(embeddings_path):
+                previous = np.load(embeddings_path, mmap_mode='r')
+                previous_count = len(previous)
+                fetch = previous.__getitem__
+            elif faiss is not None and os.path.exists(self._faiss_index_path()):
+                previous = faiss.read_index(self._faiss_index_path())
+                previous_count = previous.ntotal
+                fetch = previous.reconstruct_batch
+            else:
+                return None, []
+            if previous_count != len(previous_hashes):
+                return None, []
+
+            row_of_hash = dict(zip(previous_hashes.tolist(), range(len(previous_hashes))))
+            row_of_normalized = dict(zip(previous_normalized.tolist(), range(len(previous_normalized))))
+            reused_rows, source_rows, missing_rows = [], [], []
+            for i, (sentence_hash, normalized_hash) in enumerate(zip(hashes.tolist(), normalized_hashes.tolist())):
+                source = row_of_hash.get(sentence_hash)
+                if source is None:
+                    source = row_of_normalized.get(normalized_hash)
+                if source is None:
+                    missing_rows.append(i)
+                else:
+                    reused_rows.append(i)
+                    source_rows.append(source)
+            if not reused_rows:
+                return None, []
+
+            matrix = None
+            for start in range(0, len(reused_rows), _DB_BATCH_SIZE * 64):
+                vectors = fetch(np.asarray(source_rows[start:start + _DB_BATCH_SIZE * 64], dtype=np.int64))
+                if matrix is None:
+                    matrix = np.empty((len(hashes), vectors.shape[1]), dtype=np.float16)
+                matrix[reused_rows[start:start + _DB_BATCH_SIZE * 64]] = vectors
+            del previous, fetch  # release the map before the file is rewritten
+            return matrix, missing_rows
+        except Exception:
+            return None, []
+
+    def _encode_corpus(self, sentences: List[str], show_progress: bool = True) -> np.ndarray:
+        """
+        Encode the sentences into unit-length FP16 rows, in order.
+
+        Large corpora on a multi-core CPU are split into contiguous shards and
+        encoded by a pool of worker processes, each holding its own INT8 model
+        (a quantized model cannot be shared with spawned processes).
+        """
+        workers = os.cpu_count() or 1
+        if (self.use_int8 and workers > 1
+                and len(sentences) >= _PARALLEL_ENCODE_MIN_SENTENCES):
+            step = -(-len(sentences) // (workers * _SHARDS_PER_WORKER))
+            shards = [sentences[i:i + step] for i in range(0, len(sentences), step)]
+            print(f"Encoding on {workers} worker processes...")
+            with multiprocessing.get_context('spawn').Pool(workers, initializer=_init_encode_worker) as pool:
+                return np.concatenate(pool.map(_encode_shard, shards))
+
+        # One encode call over all the sentences; sentence-transformers batches
+        # internally and moves each batch to the model's device (GPU if present)
+        with self._inference_context():
+            return self.model.encode(
+                sentences,
+                batch_size=128,
+                convert_to_numpy=True,
+                show_progress_bar=show_progress,
+                normalize_embeddings=True
+            ).astype(np.float16)  # half the memory; cosine scores need no more precision
+
+    def _sidecar_path(self, name: str) -> str:
+        """Path of a sidecar file inside the persist directory"""
+        return os.path.join(self.persist_directory, name)
+
+    def _build_faiss_index(self, embeddings) -> None:
+        """
+        Build an inner-product FAISS index over the normalized embeddings (inner
+        product equals cosine similarity), storing the vectors as FP16, and save
+        it for later runs.
+        """
+        self.index = self.coarse_index = self.coarse_components = None
+        for index_path in (self._faiss_index_path(), self._sidecar_path(_COARSE_INDEX_FILE),
+                           self._sidecar_path(_COARSE_COMPONENTS_FILE)):
+            if os.path.exists(index_path):
+                os.remove(index_path)
+
+        if faiss is None or not _EXACT_SCAN_LIMIT < len(self.sentences) <= _FAISS_MAX_SENTENCES:
+            return
+        index_path = self._faiss_index_path()
+
+        dimension = embeddings.shape[1]
+        self.index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        for start in range(0, len(embeddings), _DB_BATCH_SIZE * 64):
+            # FAISS takes float32 input and converts it to its FP16 codes
+            self.index.add(embeddings[start:start + _DB_BATCH_SIZE * 64].astype(np.float32))
+        os.makedirs(self.persist_directory, exist_ok=True)
+        faiss.write_index(self.index, index_path)
+
+        if len(embeddings) >= _COARSE_MIN_SENTENCES and dimension > _COARSE_DIM:
+            self._build_coarse_index(embeddings)
+
+    def _build_coarse_index(self, embeddings) -> None:
+        """
+        Build the reduced first-pass index. MiniLM was not trained Matryoshka-style,
+        so its leading dimensions carry no special weight; the vectors are rotated
+        onto their top principal components first and those are kept instead.
+        """
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(len(embeddings), min(len(embeddings), _COARSE_TRAIN_SAMPLE), replace=False))
+        sample = embeddings[sample_rows].astype(np.float32)
+        mean = sample.mean(axis=0)
+        centered = sample - mean
+        _, eigenvectors = np.linalg.eigh(centered.T @ centered)
+        components = np.ascontiguousarray(eigenvectors[:, ::-1][:, :_COARSE_DIM].T, dtype=np.float32)  # (k, D)
+
+        # q . x = q . mean + q . (x - mean), and the first term is the same for every
+        # sentence, so ranking by (C q) . (C (x - mean)) approximates ranking by cosine
+        self.coarse_index = faiss.IndexFlatIP(_COARSE_DIM)
+        for start in range(0, len(embeddings), _DB_BATCH_SIZE * 64):
+            chunk = embeddings[start:start + _DB_BATCH_SIZE * 64].astype(np.float32) - mean
+            self.coarse_index.add(np.ascontiguousarray(chunk @ components.T))
+        self.coarse_components = components
+
+        faiss.write_index(self.coarse_index, self._sidecar_path(_COARSE_INDEX_FILE))
+        np.save(self._sidecar_path(_COARSE_COMPONENTS_FILE), components)
+
+    def _save_embeddings(self, embeddings) -> None:
+        """
+        Write the embeddings of a small corpus to one contiguous float32 .npy file
+        and memory-map it read-only as self.embeddings; later runs map the same
+        file instead of reading the vectors back out of the collection.
+        """
+        self.embeddings = None
+        embeddings_path = self._sidecar_path(_EMBEDDINGS_FILE)
+        if os.path.exists(embeddings_path):
+            os.remove(embeddings_path)
+        if len(self.sentences) > _EXACT_SCAN_LIMIT:
+            return
+
+        try:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            matrix = np.lib.format.open_memmap(embeddings_path, mode='w+', dtype=np.float32, shape=embeddings.shape)
+            matrix[:] = embeddings
+            matrix.flush()
+            del matrix
+        except Exception as e:
+            print(f"Error saving embeddings file: {e}")
+            self.embeddings = embeddings.astype(np.float32)
+            return
+        self._load_embeddings_file()
+
+    def _load_embeddings_file(self) -> bool:
+        """
+        Memory-map the saved float32 embeddings if they cover the loaded sentences.
+
+        Returns:
+            bool: True if self.embeddings was set from the file
+        """
+        embeddings_path = self._sidecar_path(_EMBEDDINGS_FILE)
+        if not os.path.exists(embeddings_path):
+            return False
+
+        try:
+            matrix = np.load(embeddings_path, mmap_mode='r')
+        except Exception as e:
+            print(f"Error loading embeddings file: {e}")
+            return False
+
+        if matrix.ndim != 2 or len(matrix) != len(self.sentences):
+            return False
+        self.embeddings = matrix
+        return True
+
+    def _load_embeddings_from_collection(self) -> None:
+        """
+        Read the stored embeddings back from the collection into one float32 matrix
+        for in-memory search, leaving it unset if the collection does not cover
+        every loaded sentence.
+        """
+        total_sentences = len(self.sentences)
+        matrix = None
+        found = 0
+        try:
+            for start in range(0, total_sentences, _DB_BATCH_SIZE * 6):
+                ids = [f"doc_{i}" for i in range(start, min(start + _DB_BATCH_SIZE * 6, total_sentences))]
+                stored = self.collection.get(ids=ids, include=["embeddings"])
+                if not stored['ids']:
+                    continue
+                vectors = np.asarray(stored['embeddings'], dtype=np.float32)
+                if matrix is None:
+                    matrix = np.empty((total_sentences, vectors.shape[1]), dtype=np.float32)
+                matrix[[int(doc_id[4:]) for doc_id in stored['ids']]] = vectors
+                found += len(stored['ids'])
+        except Exception as e:
+            print(f"Error reading stored embeddings: {e}")
+            return
+
+        if found == total_sentences:
+            self.embeddings = matrix
+
+    def _load_faiss_index(self) -> None:
+        """
+        Load the saved FAISS index if it covers the loaded sentences.
+        """
+        index_path = self._faiss_index_path()
+        if faiss is None or not os.path.exists(index_path):
+            return
+
+        try:
+            index = faiss.read_index(index_path)
+        except Exception as e:
+            print(f"Error loading FAISS index: {e}")
+            return
+
+        if index.ntotal != len(self.sentences):
+            return
+        self.index = index
+
+        coarse_path = self._sidecar_path(_COARSE_INDEX_FILE)
+        components_path = self._sidecar_path(_COARSE_COMPONENTS_FILE)
+        if os.path.exists(coarse_path) and os.path.exists(components_path):
+            try:
+                coarse_index = faiss.read_index(coarse_path)
+                components = np.load(components_path)
+            except Exception as e:
+                print(f"Error loading coarse FAISS index: {e}")
+                return
+            if coarse_index.ntotal == index.ntotal:
+                self.coarse_index, self.coarse_components = coarse_index, components
+
     def regular_search(self, query: str, case_sensitive: bool = False) -> List[Tuple[str, int]]:
         """
         Perform regular text search (keyword matching).
@@ -197,13 +764,45 @@ class VectorTextSearcher:
         if not case_sensitive:
             query = query.lower()
 
-        for i, sentence in enumerate(self.sentences):
-            search_text = sentence if case_sensitive else sentence.lower()
-            if query in search_text:
-                results.append((sentence, i))
+        if _SENTENCE_SEPARATOR in query:
+            # Could match across the separator; check each sentence on its own
+            for i, sentence in enumerate(self.sentences):
+                search_text = sentence if case_sensitive else sentence.lower()
+                if query in search_text:
+                    results.append((sentence, i))
+            return results
+
+        # One linear str.find scan of the joined text per match instead of a Python-level test per sentence
+        search_text = self._search_text if case_sensitive else self._search_text_lower
+        offsets = self._sentence_offsets[0 if case_sensitive else 1]
+        start = 0
+        while True:
+            found = search_text.find(query, start)
+            if found < 0:
+                break
+            i = bisect.bisect_right(offsets, found) - 1
+            results.append((self.sentences[i], i))
+            if i + 1 >= len(self.sentences):
+                break
+            start = offsets[i + 1]  # next sentence, so each is reported once
 
         return results
 
+    def _build_search_text(self):
+        """
+        Join the sentences (and their lowercase forms) into single strings for regular search,
+        recording where each sentence starts.
+        """
+        lowered = [sentence.lower() for sentence in self.sentences]
+        self._search_text = _SENTENCE_SEPARATOR.join(self.sentences)
+        self._search_text_lower = _SENTENCE_SEPARATOR.join(lowered)
+
+        # Lowercasing can change a sentence's length, so each text has its own offsets
+        self._sentence_offsets = [
+            list(itertools.accumulate((len(text) + 1 for text in texts[:-1]), initial=0))
+            for texts in (self.sentences, lowered)
+        ]
+
     def semantic_search(self, query: str, top_k: int = 5) -> List[Tuple[str, int, float]]:
         """
         Perform semantic search using ChromaDB vector database.
@@ -223,33 +822,148 @@ class VectorTextSearcher:
             print("Vector database not available.")
             return []
 
-        try:
-            # Query the vector database
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=min(top_k, len(self.sentences)),
-                include=["documents", "metadatas", "distances"]
-            )
+        if not self._index_ready.is_set():
+            print("Semantic index is still being built; waiting for it to finish...")
+            self._index_ready.wait()
+        if self._index_failed:
+            print("Semantic index not available.")
+            return []
 
-            # Process results
-            search_results = []
-            if results['documents'] and results['documents'][0]:
-                for doc, metadata, distance in zip(
-                        results['documents'][0],
-                        results['metadatas'][0],
-                        results['distances'][0]
-                ):
-                    # Convert distance to similarity score (cosine similarity)
-                    similarity = 1 - distance
-                    position = metadata['position']
-                    search_results.append((doc, position, similarity))
-
-            return search_results
+        try:
+            return list(self._search_cached(query.lower().strip(), top_k))
 
         except Exception as e:
             print(f"Error during semantic search: {e}")
             return []
 
+    def _search(self, query: str, top_k: int) -> Tuple[Tuple[str, int, float], ...]:
+        """
+        Run a semantic search (cached through self._search_cached, keyed on the normalized query).
+        """
+        query_embedding = self._embed_query(query)
+        cached = self._fuzzy_lookup(query_embedding, top_k)
+        if cached is not None:
+            return cached
+
+        search_results = self._vector_search(query_embedding, top_k)
+        self._fuzzy_store(query_embedding, top_k, search_results)
+        return search_results
+
+    def _vector_search(self, query_embedding: np.ndarray, top_k: int) -> Tuple[Tuple[str, int, float], ...]:
+        """
+        Find the top_k sentences for a query embedding: in memory for small corpora,
+        in FAISS for larger ones, or in ChromaDB without either.
+        """
+        if self.embeddings is not None:
+            return tuple(self._exact_search(query_embedding, top_k))
+        if self.index is not None:
+            return tuple(self._faiss_search(query_embedding, top_k))
+
+        # Query the vector database
+        results = self.collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=min(top_k, len(self.sentences)),
+            include=["distances"]
+        )
+
+        # Process results; ids are "doc_<position>", so the sentence text comes
+        # from self.sentences instead of being read back out of the database
+        search_results = []
+        if results['ids'] and results['ids'][0]:
+            for doc_id, distance in zip(results['ids'][0], results['distances'][0]):
+                position = int(doc_id[4:])
+                # Convert distance to similarity score (cosine similarity)
+                similarity = 1 - distance
+                search_results.append((self.sentences[position], position, similarity))
+
+        return tuple(search_results)
+
+    def _clear_fuzzy_cache(self):
+        """Forget all cached query embeddings and their results"""
+        self._qcache_embs = None
+        self._qcache_results = []
+
+    def _fuzzy_lookup(self, query_embedding: np.ndarray, top_k: int):
+        """
+        Return the cached results of the most similar earlier query if it is a
+        near-duplicate of this one and returned at least top_k results, else None.
+        """
+        if self._qcache_embs is None:
+            return None
+
+        similarities = self._qcache_embs @ query_embedding
+        best = int(np.argmax(similarities))
+        cached_top_k, cached_results = self._qcache_results[best]
+        if similarities[best] < _FUZZY_CACHE_THRESHOLD or cached_top_k < top_k:
+            return None
+
+        # Move the hit to the most recently used end
+        self._qcache_embs = np.vstack([np.delete(self._qcache_embs, best, axis=0), query_embedding])
+        self._qcache_results.append(self._qcache_results.pop(best))
+        return cached_results[:top_k]
+
+    def _fuzzy_store(self, query_embedding: np.ndarray, top_k: int, results: Tuple):
+        """
+        Remember a query's results, evicting the least recently used entry when full.
+        """
+        row = query_embedding[np.newaxis]
+        self._qcache_embs = row.copy() if self._qcache_embs is None else np.vstack([self._qcache_embs, row])
+        self._qcache_results.append((top_k, results))
+        if len(self._qcache_results) > _FUZZY_CACHE_SIZE:
+            self._qcache_embs = self._qcache_embs[1:]
+            self._qcache_results.pop(0)
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a query into a read-only unit-length float32 vector (cached through self._embed_query).
+        """
+        with self._inference_context():
+            query_embedding = self.model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0]
+        query_embedding = query_embedding.astype(np.float32)
+        query_embedding.setflags(write=False)
+        return query_embedding
+
+    def _exact_search(self, query_embedding: np.ndarray, top_k: int) -> List[Tuple[str, int, float]]:
+        """
+        Score every sentence with one BLAS matrix-vector product; rows are unit length,
+        so the scores are cosine similarities.
+        """
+        similarities = self.embeddings @ query_embedding
+        top_k = min(top_k, len(similarities))
+        if top_k <= 0:
+            return []
+        best = np.argpartition(-similarities, top_k - 1)[:top_k]
+        best = best[np.argsort(-similarities[best])]
+        return [
+            (self.sentences[i], i, similarity)
+            for i, similarity in zip(best.tolist(), similarities[best].tolist())
+        ]
+
+    def _faiss_search(self, query_embedding: np.ndarray, top_k: int) -> List[Tuple[str, int, float]]:
+        """
+        Search the in-process FAISS index; its scores are cosine similarities.
+        """
+        top_k = min(top_k, self.index.ntotal)
+        if self.coarse_index is not None:
+            # Shortlist in the reduced space, then rescore with the full FP16 vectors
+            shortlist = min(max(4 * top_k, 64), self.index.ntotal)
+            coarse_query = (self.coarse_components @ query_embedding)[np.newaxis]
+            _, candidates = self.coarse_index.search(coarse_query, shortlist)
+            candidates = candidates[0][candidates[0] >= 0]
+            scores = self.index.reconstruct_batch(candidates) @ query_embedding
+            best = np.argsort(-scores)[:top_k]
+            return [
+                (self.sentences[i], i, score)
+                for i, score in zip(candidates[best].tolist(), scores[best].tolist())
+            ]
+
+        similarities, indices = self.index.search(query_embedding[np.newaxis], top_k)
+        return [
+            (self.sentences[i], i, similarity)
+            for i, similarity in zip(indices[0].tolist(), similarities[0].tolist())
+            if i >= 0
+        ]
+
     def get_database_info(self) -> Dict:
         """
         Get information about the vector database.
@@ -364,7 +1078,7 @@ def main():
     # Initialize the search system
     searcher = VectorTextSearcher(FILE_PATH, PERSIST_DIR)
 
-    if not searcher.initialize():
+    if not searcher.initialize(background=True):
         print("Failed to initialize the search system.")
         return
 
@@ -1,9 +1,17 @@
 import re
 import os
+import bisect
+import hashlib
+import functools
+import itertools
+import numpy as np
 import chromadb
 from sentence_transformers import SentenceTransformer
 from typing import List, Tuple, Dict
 
+# Joins the sentences into one searchable text; a query containing it falls back to per-sentence checks
+_SENTENCE_SEPARATOR = "\x00"
+
 
 class VectorTextSearcher:
     def __init__(self, file_path: str, persist_directory: str = "./chroma_db"):
@@ -17,6 +25,9 @@ class VectorTextSearcher:
         self.file_path = file_path
         self.persist_directory = persist_directory
         self.sentences = []
+        self._search_text = ""
+        self._search_text_lower = ""
+        self._sentence_offsets = None
         self.model = None
         self.client = None
         self.collection = None
@@ -49,6 +60,8 @@ class VectorTextSearcher:
     def _needs_reindexing(self) -> bool:
         """
         Check if we need to reindex the database (file modified or first run).
+        The collection records the file's mtime and content hash; a changed mtime
+        only forces a reindex when the content hash differs too.
 
         Returns:
             bool: True if reindexing is needed
@@ -61,13 +74,38 @@ class VectorTextSearcher:
         try:
             client = chromadb.PersistentClient(path=self.persist_directory)
             collection = client.get_collection("text_embeddings")
-            if collection.count() == 0:
+            count = collection.count()
+            if count == 0 or count != len(self.sentences):
+                return True
+
+            metadata = collection.metadata or {}
+            if metadata.get("source_file") != self.file_path or "file_hash" not in metadata:
                 return True
+            if metadata.get("file_mtime_ns") == os.stat(self.file_path).st_mtime_ns:
+                return False
+
+            # Touched but maybe not edited: compare the contents
+            signature = self._file_signature()
+            if signature["file_hash"] != metadata["file_hash"]:
+                return True
+            collection.modify(metadata={**metadata, **signature})
         except:
             return True
 
         return False
 
+    def _file_signature(self) -> Dict:
+        """
+        Modification time (ns) and BLAKE2b digest of the text file, stored in the
+        collection metadata to detect a changed file on the next start.
+        """
+        mtime_ns = os.stat(self.file_path).st_mtime_ns
+        digest = hashlib.blake2b()
+        with open(self.file_path, 'rb') as file:
+            for block in iter(functools.partial(file.read, 1 << 20), b''):
+                digest.update(block)
+        return {"source_file": self.file_path, "file_mtime_ns": mtime_ns, "file_hash": digest.hexdigest()}
+
     def initialize(self):
         """
         Initialize the system - load text and setup vector database.
@@ -82,6 +120,7 @@ class VectorTextSearcher:
             return False
 
         print(f"Loaded {len(self.sentences)} sentences from: {self.file_path}")
+        self._build_search_text()
 
         # Initialize model
         try:
@@ -133,64 +172,58 @@ class VectorTextSearcher:
 
             self.collection = self.client.get_or_create_collection(
                 name="text_embeddings",
-                metadata={"description": "Text embeddings for semantic search"}
+                metadata={"description": "Text embeddings for semantic search", **self._file_signature()}
             )
 
             # Use smaller batch sizes for both embedding computation and database storage
             embedding_batch_size = 32
-            db_batch_size = 100  # ChromaDB batch size limit is safer with smaller batches
-
-            all_documents = []
-            all_metadatas = []
-            all_ids = []
-            all_embeddings = []
-
-            print(f"Processing {len(self.sentences)} sentences in batches...")
-
-            # Process embeddings in batches
-            for i in range(0, len(self.sentences), embedding_batch_size):
-                batch_sentences = self.sentences[i:i + embedding_batch_size]
+            db_batch_size = 166  # well under ChromaDB's maximum batch size
+
+            total_sentences = len(self.sentences)
+            ids = [f"doc_{i}" for i in range(total_sentences)]
+            metadatas = [
+                {"position": i, "length": len(sentence), "source_file": self.file_path}
+                for i, sentence in enumerate(self.sentences)
+            ]
+            all_embeddings = None
+
+            print(f"Processing {total_sentences} sentences in batches...")
+
+            # Encode in order of sentence length so each batch pads to a similar
+            # length, scattering the rows back to document order in one
+            # preallocated array
+            order = np.argsort(np.fromiter(map(len, self.sentences), dtype=np.int64, count=total_sentences),
+                               kind='stable')
+            for i in range(0, total_sentences, embedding_batch_size):
+                batch_rows = order[i:i + embedding_batch_size]
+                batch_sentences = [self.sentences[j] for j in batch_rows]
 
                 # Compute embeddings for this batch
-                batch_embeddings = self.model.encode(batch_sentences).tolist()
-                all_embeddings.extend(batch_embeddings)
-
-                # Prepare documents for this batch
-                for j, sentence in enumerate(batch_sentences):
-                    absolute_index = i + j
-                    all_documents.append(sentence)
-                    all_metadatas.append({
-                        "position": absolute_index,
-                        "length": len(sentence),
-                        "source_file": self.file_path
-                    })
-                    all_ids.append(f"doc_{absolute_index}")
+                batch_embeddings = self.model.encode(batch_sentences, convert_to_numpy=True)
+                if all_embeddings is None:
+                    all_embeddings = np.empty((total_sentences, batch_embeddings.shape[1]), dtype=np.float32)
+                all_embeddings[batch_rows] = batch_embeddings
 
                 # Show progress
-                progress = min(i + embedding_batch_size, len(self.sentences))
-                if progress % 100 == 0 or progress == len(self.sentences):
-                    print(f"  Processed: {progress}/{len(self.sentences)} sentences")
+                progress = min(i + embedding_batch_size, total_sentences)
+                if progress % 100 == 0 or progress == total_sentences:
+                    print(f"  Processed: {progress}/{total_sentences} sentences")
 
             print("Storing embeddings in database...")
 
             # Store in database in smaller batches to avoid ChromaDB limits
-            for i in range(0, len(all_documents), db_batch_size):
-                end_idx = min(i + db_batch_size, len(all_documents))
-
-                batch_documents = all_documents[i:end_idx]
-                batch_metadatas = all_metadatas[i:end_idx]
-                batch_ids = all_ids[i:end_idx]
-                batch_embeddings = all_embeddings[i:end_idx]
+            for i in range(0, total_sentences, db_batch_size):
+                end_idx = min(i + db_batch_size, total_sentences)
 
                 self.collection.add(
-                    documents=batch_documents,
-                    metadatas=batch_metadatas,
-                    ids=batch_ids,
-                    embeddings=batch_embeddings
+                    documents=self.sentences[i:end_idx],
+                    metadatas=metadatas[i:end_idx],
+                    ids=ids[i:end_idx],
+                    embeddings=all_embeddings[i:end_idx]
                 )
 
-                if end_idx % 500 == 0 or end_idx == len(all_documents):
-                    print(f"  Stored: {end_idx}/{len(all_documents)} embeddings")
+                if end_idx // 500 > i // 500 or end_idx == total_sentences:
+                    print(f"  Stored: {end_idx}/{total_sentences} embeddings")
 
             return True
 
@@ -218,13 +251,45 @@ class VectorTextSearcher:
         if not case_sensitive:
             query = query.lower()
 
-        for i, sentence in enumerate(self.sentences):
-            search_text = sentence if case_sensitive else sentence.lower()
-            if query in search_text:
-                results.append((sentence, i))
+        if _SENTENCE_SEPARATOR in query:
+            # Could match across the separator; check each sentence on its own
+            for i, sentence in enumerate(self.sentences):
+                search_text = sentence if case_sensitive else sentence.lower()
+                if query in search_text:
+                    results.append((sentence, i))
+            return results
+
+        # One linear str.find scan of the joined text per match instead of a Python-level test per sentence
+        search_text = self._search_text if case_sensitive else self._search_text_lower
+        offsets = self._sentence_offsets[0 if case_sensitive else 1]
+        start = 0
+        while True:
+            found = search_text.find(query, start)
+            if found < 0:
+                break
+            i = bisect.bisect_right(offsets, found) - 1
+            results.append((self.sentences[i], i))
+            if i + 1 >= len(self.sentences):
+                break
+            start = offsets[i + 1]  # next sentence, so each is reported once
 
         return results
 
+    def _build_search_text(self):
+        """
+        Join the sentences (and their lowercase forms) into single strings for regular search,
+        recording where each sentence starts.
+        """
+        lowered = [sentence.lower() for sentence in self.sentences]
+        self._search_text = _SENTENCE_SEPARATOR.join(self.sentences)
+        self._search_text_lower = _SENTENCE_SEPARATOR.join(lowered)
+
+        # Lowercasing can change a sentence's length, so each text has its own offsets
+        self._sentence_offsets = [
+            list(itertools.accumulate((len(text) + 1 for text in texts[:-1]), initial=0))
+            for texts in (self.sentences, lowered)
+        ]
+
     def semantic_search(self, query: str, top_k: int = 5) -> List[Tuple[str, int, float]]:
         """
         Perform semantic search using ChromaDB vector database.
@@ -252,21 +317,18 @@ class VectorTextSearcher:
             results = self.collection.query(
                 query_texts=[query],
                 n_results=top_k,
-                include=["documents", "metadatas", "distances"]
+                include=["distances"]
             )
 
-            # Process results
+            # Process results; ids are "doc_<position>", so the sentence text comes
+            # from self.sentences instead of being read back out of the database
             search_results = []
-            if results['documents'] and results['documents'][0]:
-                for doc, metadata, distance in zip(
-                        results['documents'][0],
-                        results['metadatas'][0],
-                        results['distances'][0]
-                ):
+            if results['ids'] and results['ids'][0]:
+                for doc_id, distance in zip(results['ids'][0], results['distances'][0]):
+                    position = int(doc_id[4:])
                     # Convert distance to similarity score (cosine similarity)
                     similarity = 1 - distance
-                    position = metadata['position']
-                    search_results.append((doc, position, similarity))
+                    search_results.append((self.sentences[position], position, similarity))
 
             return search_results
 